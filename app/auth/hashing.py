@@ -0,0 +1,99 @@
+# app/auth/hashing.py
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+# --- Configuration du hachage des mots de passe ---
+# Coût bcrypt (2^rounds itérations). Toute modification déclenche un re-hachage
+# transparent des mots de passe à la prochaine connexion de chaque utilisateur.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Nombre de processus dédiés au hachage (bcrypt est limité par le CPU)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+# Nombre maximal d'opérations en cours ou en file avant de répondre 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4)))
+
+# Contexte pour hachage avec l'algorithme bcrypt.
+# min_rounds = max_rounds = BCRYPT_ROUNDS : un haché produit avec un autre coût est considéré obsolète.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+_lock = threading.Lock()
+
+
+# --- Fonctions exécutées dans les processus de travail (doivent rester au niveau du module) ---
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # "spawn" : on ne duplique pas un processus multi-threadé (boucle, threadpool, SQLAlchemy)
+            _executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+async def _run_in_pool(func, *args):
+    """
+    Exécute `func` dans le pool de processus dédié.
+    Lève une 503 immédiatement si trop d'opérations sont déjà en attente,
+    plutôt que de laisser la file (et la latence) grandir sans limite.
+    """
+    global _pending
+    with _lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Service d'authentification saturé, veuillez réessayer dans un instant.",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), func, *args)
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """Hache un mot de passe dans le pool dédié."""
+    return await _run_in_pool(_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Vérifie un mot de passe dans le pool dédié.
+    Retourne (valide, nouveau_haché) : nouveau_haché est renseigné lorsque le haché
+    stocké utilise d'anciens paramètres de coût et doit être remplacé.
+    """
+    return await _run_in_pool(_verify_and_update, plain_password, hashed_password)
+
+
+def shutdown_password_pool():
+    """Arrête les processus de hachage (à l'arrêt de l'application)."""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -1,5 +1,7 @@
 # app/auth/jwt.py
 
+import hashlib
+import secrets
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from typing import Dict, Any
@@ -12,6 +14,7 @@ from fastapi import HTTPException, status # Importez status ici
 SECRET_KEY = "SallEtSene" # Remplacez par une chaîne de caractères aléatoire et complexe en production!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 # Le token expire après 30 minutes
+REFRESH_TOKEN_EXPIRE_DAYS = 30 # Le jeton de rafraîchissement expire après 30 jours
 
 # --- Fonctions de Création de Token ---
 
@@ -24,11 +27,30 @@ def create_access_token(data: dict):
         str: Le token JWT encodé.
     """
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire}) # Ajoute la date d'expiration au payload
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": now}) # Ajoute l'expiration et la date d'émission au payload
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# --- Jetons de rafraîchissement ---
+# Ce ne sont pas des JWT : une valeur aléatoire opaque, stockée hachée en base,
+# que l'on peut révoquer et faire tourner à chaque utilisation.
+
+def generate_refresh_token() -> str:
+    """Génère un jeton de rafraîchissement aléatoire (à transmettre une seule fois au client)."""
+    return secrets.token_urlsafe(48)
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Empreinte SHA-256 du jeton, utilisée pour le stockage et la recherche indexée.
+    Un hachage rapide suffit : le jeton est aléatoire et à forte entropie (contrairement à un mot de passe).
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def refresh_token_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+
 # --- Fonctions de Décodage et de Validation de Token ---
 
 def get_token_data(token: str) -> Dict[str, Any]:
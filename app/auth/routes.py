@@ -1,27 +1,30 @@
-from fastapi import APIRouter, HTTPException, Depends
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import User
-from app.schemas import UserCreate, UserResponse, UserLogin
-from .utils import hash_password, verify_password
-from .jwt import create_access_token
+from app.models import User, RefreshToken
+from app.schemas import UserCreate, UserResponse, UserLogin, RefreshTokenRequest, RefreshTokenResponse
+from .utils import principal_claims
+from .hashing import hash_password_async, verify_password_async
+from .jwt import create_access_token, generate_refresh_token, hash_refresh_token, refresh_token_expiry
 
 router = APIRouter(prefix="/auth", tags=["Authentification"])
 
-# --- Enregistrement d'un utilisateur ---
-@router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+# Les endpoints sont asynchrones : le hachage bcrypt part dans un pool de processus dédié
+# et les accès à la base (courts) passent par le threadpool, pour ne bloquer ni l'un ni l'autre.
+
+def _check_user_unique(db: Session, user: UserCreate):
     # Vérifier si l'email est déjà utilisé
     if db.query(User).filter(User.email == user.email).first():
         raise HTTPException(status_code=400, detail="Email déjà utilisé.")
-    
+
     # Vérifier si le CNI est déjà utilisé
     if user.cni and db.query(User).filter(User.cni == user.cni).first():
         raise HTTPException(status_code=400, detail="CNI déjà utilisé par un autre utilisateur.")
 
-    # Hachage du mot de passe
-    hashed_pwd = hash_password(user.password)
-
+def _create_user(db: Session, user: UserCreate, hashed_pwd: str) -> User:
     # Création d'un nouvel utilisateur avec tous les champs
     user_data = user.model_dump()  # Utiliser model_dump() pour Pydantic v2
     user_data['password'] = hashed_pwd  # Ajouter le mot de passe haché
@@ -32,19 +35,123 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     db.refresh(new_user)
     return new_user
 
+def _get_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+def _update_password_hash(db: Session, db_user: User, new_hash: str):
+    db_user.password = new_hash
+    db.commit()
+    db.refresh(db_user)
+
+def _issue_refresh_token(db: Session, user_id: int):
+    """Crée un jeton de rafraîchissement pour l'utilisateur (non commité) et retourne sa valeur en clair."""
+    token = generate_refresh_token()
+    db_token = RefreshToken(user_id=user_id, token_hash=hash_refresh_token(token), expire_le=refresh_token_expiry())
+    db.add(db_token)
+    db.flush()
+    return token, db_token
+
+def _login_refresh_token(db: Session, db_user: User) -> str:
+    token, _ = _issue_refresh_token(db, db_user.id)
+    db.commit()
+    db.refresh(db_user)  # Le commit expire l'instance, renvoyée dans la réponse
+    return token
+
+# --- Enregistrement d'un utilisateur ---
+@router.post("/register", response_model=UserResponse)
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    await run_in_threadpool(_check_user_unique, db, user)
+
+    # Hachage du mot de passe
+    hashed_pwd = await hash_password_async(user.password)
+
+    return await run_in_threadpool(_create_user, db, user, hashed_pwd)
+
 # --- Connexion d'un utilisateur ---
 @router.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db: Session = Depends(get_db)):
     # Recherche de l'utilisateur par email
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await run_in_threadpool(_get_user_by_email, db, user.email)
 
     # Vérification des identifiants
-    if not db_user or not verify_password(user.password, db_user.password):
+    if not db_user:
+        raise HTTPException(status_code=400, detail="Identifiants incorrects.")
+    valid, new_hash = await verify_password_async(user.password, db_user.password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Identifiants incorrects.")
 
-    # Création du token JWT avec l'ID de l'utilisateur
-    token = create_access_token({
-        "sub": db_user.email,
-        "user_id": db_user.id  # Ajout de l'ID de l'utilisateur pour la validation
-    })
-    return {"access_token": token, "token_type": "bearer", "user": db_user }
+    # Les paramètres de coût ont changé depuis le hachage : on remplace le haché stocké
+    if new_hash:
+        await run_in_threadpool(_update_password_hash, db, db_user, new_hash)
+
+    # Création du token JWT avec l'ID, le rôle et l'identité de l'utilisateur.
+    # Ces claims permettent à get_current_principal de ne pas relire l'utilisateur en base.
+    token = create_access_token(principal_claims(db_user))
+    # Jeton de rafraîchissement : le client n'aura plus à renvoyer son mot de passe
+    refresh_token = await run_in_threadpool(_login_refresh_token, db, db_user)
+    return {"access_token": token, "refresh_token": refresh_token, "token_type": "bearer", "user": db_user }
+
+# --- Rafraîchissement du token d'accès (sans mot de passe) ---
+@router.post("/refresh", response_model=RefreshTokenResponse)
+def refresh(payload: RefreshTokenRequest, db: Session = Depends(get_db)):
+    invalid_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Jeton de rafraîchissement invalide ou expiré.",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    # Recherche indexée par empreinte (le jeton en clair n'est jamais stocké)
+    db_token = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_refresh_token(payload.refresh_token)
+    ).first()
+    if db_token is None:
+        raise invalid_exception
+
+    now = datetime.utcnow()
+    if db_token.revoque_le is not None:
+        # Un jeton déjà utilisé est présenté à nouveau : il a probablement été volé.
+        # On révoque toute la session de l'utilisateur par précaution.
+        db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == db_token.user_id, RefreshToken.revoque_le.is_(None))
+            .values(revoque_le=now)
+        )
+        db.commit()
+        raise invalid_exception
+    if db_token.expire_le < now:
+        raise invalid_exception
+
+    db_user = db.query(User).filter(User.id == db_token.user_id).first()
+    if db_user is None:
+        raise invalid_exception
+
+    # Rotation : l'ancien jeton est révoqué de façon atomique (une seule requête concurrente gagne)
+    new_token, new_db_token = _issue_refresh_token(db, db_user.id)
+    rotated = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == db_token.id, RefreshToken.revoque_le.is_(None))
+        .values(revoque_le=now, remplace_par_id=new_db_token.id)
+    ).rowcount
+    if rotated != 1:
+        db.rollback()
+        raise invalid_exception
+    db.commit()
+
+    return RefreshTokenResponse(
+        access_token=create_access_token(principal_claims(db_user)),
+        refresh_token=new_token,
+    )
+
+# --- Déconnexion : révocation du jeton de rafraîchissement ---
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(payload: RefreshTokenRequest, db: Session = Depends(get_db)):
+    db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == hash_refresh_token(payload.refresh_token),
+            RefreshToken.revoque_le.is_(None),
+        )
+        .values(revoque_le=datetime.utcnow())
+    )
+    db.commit()
+    return
@@ -1,6 +1,13 @@
 # app/auth/utils.py
 
-from passlib.context import CryptContext
+import calendar
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from pydantic import BaseModel
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
@@ -11,8 +18,8 @@ from app import models
 # SECRET_KEY n'est plus définie ici, elle est gérée dans jwt.py
 from app.auth.jwt import get_token_data 
 
-# Contexte pour hachage avec l'algorithme bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Contexte pour hachage avec l'algorithme bcrypt (partagé avec le pool de hachage)
+from app.auth.hashing import pwd_context
 
 # OAuth2 scheme
 # Le tokenUrl doit correspondre à votre endpoint FastAPI de connexion (par exemple, /auth/login).
@@ -77,3 +84,137 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Une erreur interne est survenue lors de l'authentification.",
         )
+
+
+# --- Chemin rapide : principal issu des claims du token ---
+# Seule la date d'invalidation des tokens de l'utilisateur est lue en base (au plus une
+# fois par minute et par utilisateur) : une modification ou suppression est prise en
+# compte par tous les processus en PRINCIPAL_CACHE_TTL_SECONDS au plus.
+
+# Durée de vie d'une entrée du cache (secondes) et nombre maximal d'entrées
+PRINCIPAL_CACHE_TTL_SECONDS = 60
+PRINCIPAL_CACHE_MAX_SIZE = 10000
+
+class Principal(BaseModel):
+    """
+    Identité de l'utilisateur authentifié, reconstruite depuis le token.
+    Suffisante pour les endpoints qui n'ont besoin que de l'id, du rôle ou de l'email.
+    """
+    id: int
+    email: str
+    role: str
+    nom: Optional[str] = None
+    prenom: Optional[str] = None
+
+# Cache LRU token -> (principal, instant d'expiration). Propre à chaque processus.
+_principal_cache: "OrderedDict[str, tuple]" = OrderedDict()
+# Copie locale de users.jetons_invalides_le : user_id -> (timestamp, ou None si l'utilisateur
+# n'existe plus ; instant jusqu'auquel la valeur est crue). La référence est en base :
+# elle vaut pour tous les workers et survit aux redémarrages.
+_user_invalidated_at: Dict[int, Tuple[Optional[float], float]] = {}
+_principal_lock = threading.Lock()
+
+def principal_claims(user: models.User) -> dict:
+    """Claims à inclure dans le token d'accès pour permettre le chemin rapide."""
+    return {
+        "sub": user.email,
+        "user_id": user.id,
+        "role": user.role,
+        "nom": user.nom,
+        "prenom": user.prenom,
+    }
+
+def invalidate_user_principal(user_id: int, db_user: Optional[models.User] = None):
+    """
+    À appeler lors de la modification (avant le commit, avec db_user) ou après la suppression
+    d'un utilisateur : ses tokens déjà émis ne sont plus crus sur parole, dans tous les
+    processus (users.jetons_invalides_le), et ses entrées du cache local sont vidées.
+    """
+    if db_user is not None:
+        db_user.jetons_invalides_le = datetime.utcnow()
+    with _principal_lock:
+        _user_invalidated_at.pop(user_id, None)
+        for token in [t for t, (p, _) in _principal_cache.items() if p.id == user_id]:
+            del _principal_cache[token]
+
+def _tokens_invalidated_at(db: Session, user_id: int) -> Optional[float]:
+    """
+    Instant avant lequel les tokens de l'utilisateur doivent être relus en base (0 : aucun),
+    None si l'utilisateur n'existe plus. Lu en base au plus une fois par
+    PRINCIPAL_CACHE_TTL_SECONDS et par utilisateur.
+    """
+    now = time.time()
+    with _principal_lock:
+        entry = _user_invalidated_at.get(user_id)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+    row = db.query(models.User.jetons_invalides_le).filter(models.User.id == user_id).first()
+    if row is None:
+        invalidated_at = None
+    else:
+        invalidated_at = calendar.timegm(row[0].utctimetuple()) if row[0] else 0
+    with _principal_lock:
+        _user_invalidated_at[user_id] = (invalidated_at, now + PRINCIPAL_CACHE_TTL_SECONDS)
+    return invalidated_at
+
+def _cache_get(token: str) -> Optional[Principal]:
+    with _principal_lock:
+        entry = _principal_cache.get(token)
+        if entry is None:
+            return None
+        principal, expires_at = entry
+        if expires_at < time.time():
+            del _principal_cache[token]
+            return None
+        _principal_cache.move_to_end(token)
+        return principal
+
+def _cache_put(token: str, principal: Principal, token_exp: float):
+    with _principal_lock:
+        _principal_cache[token] = (principal, min(time.time() + PRINCIPAL_CACHE_TTL_SECONDS, token_exp))
+        _principal_cache.move_to_end(token)
+        while len(_principal_cache) > PRINCIPAL_CACHE_MAX_SIZE:
+            _principal_cache.popitem(last=False)
+
+# Dépendance FastAPI allégée : n'interroge la base que si le token ne suffit pas
+def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Erreur lors de la validation des informations d'authentification: 401: Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    principal = _cache_get(token)
+    if principal is not None:
+        return principal
+
+    # get_token_data lève déjà une 401 si le token est invalide ou expiré
+    payload = get_token_data(token)
+    user_id = payload.get("user_id")
+    if user_id is None:
+        raise credentials_exception
+
+    trusted_claims = payload.get("role") is not None and payload.get("sub") is not None
+    if trusted_claims:
+        invalidated_at = _tokens_invalidated_at(db, user_id)
+        if invalidated_at is None:  # Utilisateur supprimé
+            raise credentials_exception
+        trusted_claims = payload.get("iat", 0) > invalidated_at
+
+    if trusted_claims:
+        principal = Principal(
+            id=user_id,
+            email=payload["sub"],
+            role=payload["role"],
+            nom=payload.get("nom"),
+            prenom=payload.get("prenom"),
+        )
+    else:
+        # Ancien token sans claims, ou utilisateur modifié depuis l'émission : relecture en base
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if user is None:
+            raise credentials_exception
+        principal = Principal(id=user.id, email=user.email, role=user.role, nom=user.nom, prenom=user.prenom)
+
+    _cache_put(token, principal, payload["exp"])
+    return principal
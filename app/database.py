@@ -1,17 +1,25 @@
 # app/database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from app.services.metrics import MeasuredQueuePool
+from app.services.slow_query_log import install_slow_query_log
+
 # URL de la base de données SQLite (elle sera créée automatiquement si elle n'existe pas)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./airbnb.db"
 
 # Création du moteur de connexion SQLite
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=MeasuredQueuePool, # Mesure le temps d'attente d'une connexion (voir /metrics)
 )
 
+# Journalisation des requêtes lentes (durée, forme des paramètres, route, plan d'exécution)
+install_slow_query_log(engine)
+
 # Création d'une session de base de données
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -25,3 +33,35 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def create_missing_indexes():
+    """
+    Crée les index déclarés dans les modèles qui n'existent pas encore en base.
+    create_all() ne touche pas aux tables existantes : les index ajoutés après
+    coup n'y seraient jamais créés.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def create_missing_columns():
+    """
+    Ajoute les colonnes déclarées dans les modèles qui manquent aux tables existantes
+    (ALTER TABLE ... ADD COLUMN). Seules les colonnes nullables sont ajoutées
+    automatiquement : les autres demandent une migration.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    print(f"Colonne {table.name}.{column.name} absente et non nullable : migration nécessaire")
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
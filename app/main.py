@@ -1,6 +1,5 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from app.auth.routes import router as auth_router
 
@@ -17,12 +16,25 @@ from app.routers.recherche import router as recherche_router # <-- AJOUTEZ CETTE
 from app.routers.locataire_contrats import router as locataire_contrats_router  
 from app.routers.paiements import router as paiements_router    
 from app.routers.proprietaire_paiements import router as proprietaire_paiements_router    
+from app.routers.metrics import router as metrics_router
+from app.routers.exports import router as exports_router
+from app.routers.imports import router as imports_router
+from app.routers.media_files import router as media_files_router
 
-from app.database import Base, engine
+from app.database import Base, engine, create_missing_columns, create_missing_indexes
+from app.services.request_context import RequestContextMiddleware
+from app.services.metrics import MetricsMiddleware
+from app.services.json_response import FastJSONResponse
+from app.auth.hashing import shutdown_password_pool
+from app.services.media_derivatives import shutdown_derivative_pool
+from app.services.outbox_worker import start_embedded_worker, stop_embedded_worker
 
 Base.metadata.create_all(bind=engine)
+create_missing_columns()
+create_missing_indexes()
 
-app = FastAPI(title="Hebergement - API Backend")
+# Encodage JSON natif (orjson si installé) pour toutes les réponses
+app = FastAPI(title="Hebergement - API Backend", default_response_class=FastJSONResponse)
 
 # Configurer CORS
 origins = [
@@ -38,6 +50,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latence, codes de statut et requêtes en cours par route (exposés sur /metrics)
+app.add_middleware(MetricsMiddleware)
+# Publie le scope de la requête (route appelante) pour l'instrumentation.
+# Ajouté en dernier pour envelopper les autres middlewares.
+app.add_middleware(RequestContextMiddleware)
+
 app.include_router(auth_router)
 
 # INCLUSION DES NOUVEAUX ROUTEURS CRUD
@@ -52,8 +70,35 @@ app.include_router(problemes_router)
 app.include_router(recherche_router) # <-- AJOUTEZ CETTE LIGNE
 app.include_router(locataire_contrats_router)
 app.include_router(proprietaire_paiements_router)
-# Serve static files for uploaded media
-app.mount("/uploaded_media", StaticFiles(directory="uploaded_media"), name="uploaded_media")
+app.include_router(metrics_router)
+app.include_router(exports_router)
+app.include_router(imports_router)
+# Fichiers uploadés : cache immutable, ETag et requêtes Range (voir media_serving.py)
+app.include_router(media_files_router)
+
+
+@app.on_event("startup")
+def start_outbox_worker():
+    # En production le worker tourne à part (scripts/outbox_worker.py) ;
+    # OUTBOX_WORKER_EMBEDDED=true le lance dans le processus de l'API
+    start_embedded_worker()
+
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    # Arrête les processus dédiés au hachage bcrypt
+    shutdown_password_pool()
+
+
+@app.on_event("shutdown")
+def stop_outbox_worker():
+    stop_embedded_worker()
+
+
+@app.on_event("shutdown")
+def stop_derivative_pool():
+    # Arrête les processus de traitement d'images
+    shutdown_derivative_pool()
 
 
 @app.get("/")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, Date, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Float, Date, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base  # Assure-toi que Base = declarative_base()
@@ -16,6 +16,8 @@ class User(Base):
     role = Column(String, nullable=False)  # proprietaire | locataire
     password = Column(String, nullable=False)
     cree_le = Column(DateTime, default=datetime.utcnow)
+    # Tokens d'accès émis avant cet instant : claims ignorés, utilisateur relu en base
+    jetons_invalides_le = Column(DateTime, nullable=True)
 
     maisons = relationship("Maison", back_populates="proprietaire")
     contrats = relationship("Contrat", back_populates="locataire")
@@ -34,7 +36,7 @@ class Maison(Base):
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
     description = Column(String, nullable=True)
-    proprietaire_id = Column(Integer, ForeignKey("users.id"))
+    proprietaire_id = Column(Integer, ForeignKey("users.id"), index=True)
     cree_le = Column(DateTime, default=datetime.utcnow)
 
     proprietaire = relationship("User", back_populates="maisons")
@@ -46,7 +48,7 @@ class Chambre(Base):
     __tablename__ = "chambres"
 
     id = Column(Integer, primary_key=True, index=True)
-    maison_id = Column(Integer, ForeignKey("maisons.id"))
+    maison_id = Column(Integer, ForeignKey("maisons.id"), index=True)
     titre = Column(String, nullable=False)
     description = Column(String, nullable=True)
     taille = Column(String, nullable=True)
@@ -66,10 +68,14 @@ class Chambre(Base):
 # --- Contrat ---
 class Contrat(Base):
     __tablename__ = "contrats"
+    __table_args__ = (
+        # Contrats d'un locataire, paginés par date de début décroissante
+        Index("ix_contrats_locataire_date_debut", "locataire_id", "date_debut", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     locataire_id = Column(Integer, ForeignKey("users.id"))
-    chambre_id = Column(Integer, ForeignKey("chambres.id"))
+    chambre_id = Column(Integer, ForeignKey("chambres.id"), index=True)
     date_debut = Column(Date, nullable=False)
     date_fin = Column(Date, nullable=False)
     montant_caution = Column(Float, nullable=False)
@@ -89,6 +95,12 @@ class Contrat(Base):
 # --- Paiement ---
 class Paiement(Base):
     __tablename__ = "paiements"
+    __table_args__ = (
+        # Paiements d'un contrat, paginés par échéance décroissante
+        Index("ix_paiements_contrat_echeance", "contrat_id", "date_echeance", "id"),
+        # Listes multi-contrats (propriétaire, /paiements/me) triées par échéance
+        Index("ix_paiements_echeance", "date_echeance", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     contrat_id = Column(Integer, ForeignKey("contrats.id"))
@@ -116,6 +128,19 @@ class RendezVous(Base):
     chambre = relationship("Chambre", back_populates="rendezvous", lazy='joined')
 
 
+# --- Fichier média stocké par empreinte (partagé entre médias identiques) ---
+class MediaBlob(Base):
+    __tablename__ = "media_blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String, unique=True, index=True, nullable=False)
+    chemin = Column(String, nullable=False)  # uploaded_media/<sha256>-<suffixe>.<extension>
+    taille = Column(Integer, nullable=False)
+    type = Column(String, nullable=False)
+    nb_references = Column(Integer, nullable=False, default=0)  # médias pointant vers ce fichier
+    cree_le = Column(DateTime, default=datetime.utcnow)
+
+
 # --- Media ---
 class Media(Base):
     __tablename__ = "medias"
@@ -123,11 +148,39 @@ class Media(Base):
     id = Column(Integer, primary_key=True, index=True)
     chambre_id = Column(Integer, ForeignKey("chambres.id"))
     url = Column(String, nullable=False)
+    blob_id = Column(Integer, ForeignKey("media_blobs.id"), nullable=True, index=True)  # NULL : upload antérieur au stockage par empreinte
     type = Column(String, nullable=False)  # photo | video
     description = Column(String, nullable=True)
+    taille = Column(Integer, nullable=True)    # octets
+    sha256 = Column(String, nullable=True)     # empreinte du contenu, calculée à l'upload
+    # Déclinaisons des photos (media_derivatives.py) : {taille: {webp, jpeg, largeur, hauteur}}
+    derives = Column(JSON, nullable=True)
+    derives_statut = Column(String, nullable=True)  # en_attente | pret | echec (NULL : sans objet)
+    largeur = Column(Integer, nullable=True)
+    hauteur = Column(Integer, nullable=True)
+    apercu = Column(String, nullable=True)          # aperçu flou minuscule (data URI)
     cree_le = Column(DateTime, default=datetime.utcnow)
 
     chambre = relationship("Chambre", back_populates="medias")
+    blob = relationship("MediaBlob")
+
+
+# --- Upload reprenable (media_uploads.py) ---
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(String, primary_key=True)  # jeton opaque remis au client
+    chambre_id = Column(Integer, ForeignKey("chambres.id"), nullable=False)
+    utilisateur_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    taille = Column(Integer, nullable=False)                   # taille totale annoncée, en octets
+    octets_recus = Column(Integer, nullable=False, default=0)  # prochain offset attendu
+    chemin = Column(String, nullable=False)                    # fichier temporaire
+    description = Column(String, nullable=True)
+    cree_le = Column(DateTime, default=datetime.utcnow)
+    expire_le = Column(DateTime, nullable=False, index=True)   # repoussée à chaque morceau reçu
+    # Envoi d'un morceau en cours : un seul à la fois (bail renouvelé pendant l'écriture)
+    ecriture_jeton = Column(String, nullable=True)
+    ecriture_jusqu_au = Column(DateTime, nullable=True)
 
 
 # --- Probleme ---
@@ -145,3 +198,66 @@ class Probleme(Base):
 
     contrat = relationship("Contrat", back_populates="problemes")
     signaleur = relationship("User", back_populates="problemes_signales")
+
+
+# --- Jeton de rafraîchissement ---
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String, unique=True, index=True, nullable=False)  # SHA-256 du jeton, jamais le jeton en clair
+    expire_le = Column(DateTime, nullable=False)
+    revoque_le = Column(DateTime, nullable=True)  # renseigné à la rotation ou à la déconnexion
+    remplace_par_id = Column(Integer, ForeignKey("refresh_tokens.id"), nullable=True)
+    cree_le = Column(DateTime, default=datetime.utcnow)
+
+    user = relationship("User")
+
+
+# --- File d'envoi des notifications (outbox) ---
+class NotificationOutbox(Base):
+    __tablename__ = "notifications_outbox"
+    __table_args__ = (
+        # Sélection des messages à envoyer par le worker
+        Index("ix_notifications_outbox_statut_prochaine", "statut", "prochaine_tentative_le"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    destinataire = Column(String, nullable=False)
+    sujet = Column(String, nullable=False)
+    corps_texte = Column(String, nullable=False)
+    corps_html = Column(String, nullable=True)
+    # Modèle + contexte (JSON) rendus par le worker (email_templates.py) ; sujet et corps restent vides
+    modele = Column(String, nullable=True)
+    contexte = Column(String, nullable=True)
+    statut = Column(String, nullable=False, default="en_attente")  # en_attente | en_cours | envoye | echec
+    tentatives = Column(Integer, nullable=False, default=0)
+    prochaine_tentative_le = Column(DateTime, nullable=False, default=datetime.utcnow)
+    verrouille_le = Column(DateTime, nullable=True)  # prise en charge par un worker
+    verrouille_par = Column(String, nullable=True)   # jeton du lot qui l'a réservé
+    derniere_erreur = Column(String, nullable=True)
+    cree_le = Column(DateTime, default=datetime.utcnow)
+    envoye_le = Column(DateTime, nullable=True)
+
+
+# --- Événements en attente du résumé propriétaire (owner_digest.py) ---
+class OwnerNotificationEvent(Base):
+    __tablename__ = "notifications_proprietaire_evenements"
+    __table_args__ = (
+        # Regroupement par destinataire et détection des fenêtres échues
+        Index("ix_notifications_proprietaire_dest_cree", "destinataire", "cree_le"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    destinataire = Column(String, nullable=False)
+    # Pas de clé étrangère : le rendez-vous peut avoir été supprimé avant l'envoi du résumé
+    rendez_vous_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)  # creation | modification_date | annulation_locataire | annulation_proprietaire
+    # Instantané des informations affichées dans le résumé
+    chambre_titre = Column(String, nullable=True)
+    adresse = Column(String, nullable=True)
+    locataire_nom = Column(String, nullable=True)
+    locataire_telephone = Column(String, nullable=True)
+    date_heure = Column(DateTime, nullable=True)
+    cree_le = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,22 +1,109 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from typing import Any, Dict, List, Optional, Set, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session, joinedload, selectinload, noload, load_only
+from sqlalchemy import and_, inspect
 
 from app import models, schemas
 from app.database import get_db
-from app.auth.utils import get_current_user
+from app.auth.utils import get_current_principal, Principal
 
 router = APIRouter(
     prefix="/chambres", # Le préfixe de l'URL sera /chambres
     tags=["Chambres"],  # Tag pour la documentation Swagger UI
 )
 
+# --- Champs partiels (?fields=) et relations explicites (?include=) ---
+
+# Colonnes de la chambre pouvant être demandées via ?fields=
+CHAMBRE_FIELDS = [column.key for column in inspect(models.Chambre).column_attrs]
+# Relations pouvant être demandées via ?include=
+CHAMBRE_RELATIONS = {
+    "maison": models.Chambre.maison,
+    "contrats": models.Chambre.contrats,
+    "medias": models.Chambre.medias,
+    "rendezvous": models.Chambre.rendezvous,
+}
+# Sans ?include=, les relations de ChambreResponse : maison, contrats et médias
+# (rendezvous est en lazy='noload' sur le modèle et reste une liste vide)
+DEFAULT_INCLUDE = {"maison", "contrats", "medias"}
+
+def _parse_list_param(value: Optional[str], allowed: Set[str], name: str) -> Optional[Set[str]]:
+    if value is None:
+        return None
+    requested = {item.strip() for item in value.split(",") if item.strip()}
+    unknown = requested - allowed
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Valeur(s) inconnue(s) pour '{name}': {', '.join(sorted(unknown))}. "
+                   f"Valeurs possibles: {', '.join(sorted(allowed))}."
+        )
+    return requested
+
+def parse_fieldset(
+    fields: Optional[str] = Query(None, description="Colonnes de la chambre à renvoyer, séparées par des virgules (ex: titre,prix)"),
+    include: Optional[str] = Query(None, description="Relations à inclure: maison, contrats, medias, rendezvous (défaut: maison, contrats, medias)"),
+) -> Tuple[Optional[Set[str]], Optional[Set[str]]]:
+    """
+    Dépendance : valide ?fields= et ?include= et retourne (colonnes, relations) ;
+    None signifie « non précisé » (toutes les colonnes, relations par défaut).
+    """
+    columns = _parse_list_param(fields, set(CHAMBRE_FIELDS), "fields")
+    if columns is not None:
+        columns.add("id")  # L'identifiant est toujours renvoyé (et nécessaire aux relations)
+    return columns, _parse_list_param(include, set(CHAMBRE_RELATIONS), "include")
+
+def chambre_load_options(columns: Optional[Set[str]], relations: Optional[Set[str]]) -> list:
+    """
+    Stratégie de chargement ORM dérivée du fieldset : seules les colonnes et
+    relations demandées sont lues ; les autres relations ne sont jamais chargées.
+    """
+    if relations is None:
+        relations = DEFAULT_INCLUDE
+    options = []
+    if columns is not None:
+        options.append(load_only(*[getattr(models.Chambre, name) for name in columns]))
+    for name, relation in CHAMBRE_RELATIONS.items():
+        if name not in relations:
+            options.append(noload(relation))
+        elif name == "maison":
+            options.append(joinedload(relation))
+        elif name == "rendezvous":
+            # RendezVous charge par défaut locataire et chambre (lazy='joined') : inutile ici
+            options.append(selectinload(relation).options(
+                noload(models.RendezVous.locataire), noload(models.RendezVous.chambre)
+            ))
+        else:
+            options.append(selectinload(relation).options(noload("*")))
+    return options
+
+def _columns_dict(obj) -> Dict[str, Any]:
+    return {column.key: getattr(obj, column.key) for column in inspect(obj).mapper.column_attrs}
+
+def serialize_chambre(chambre: models.Chambre, columns: Optional[Set[str]], relations: Optional[Set[str]]) -> Dict[str, Any]:
+    """
+    Sérialise uniquement les colonnes et relations demandées. Sans ?include=,
+    la réponse a la forme de ChambreResponse (rendezvous compris, toujours vide).
+    """
+    data = {name: getattr(chambre, name) for name in CHAMBRE_FIELDS if columns is None or name in columns}
+    if relations is None:
+        relations = DEFAULT_INCLUDE
+        data["rendezvous"] = []
+    for name in CHAMBRE_RELATIONS:
+        if name not in relations:
+            continue
+        value = getattr(chambre, name)
+        if name == "maison":
+            data[name] = _columns_dict(value) if value is not None else None
+        else:
+            data[name] = [_columns_dict(item) for item in value]
+    return data
+
 @router.post("/", response_model=schemas.ChambreResponse, status_code=status.HTTP_201_CREATED)
 def create_chambre(
     chambre: schemas.ChambreCreate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Crée une nouvelle chambre pour la maison du propriétaire.
@@ -41,37 +128,51 @@ def create_chambre(
     db.refresh(db_chambre)
     return db_chambre
 
-@router.get("/mes-chambres", response_model=List[schemas.ChambreResponse], include_in_schema=False)
-@router.get("/", response_model=List[schemas.ChambreResponse])
+@router.get("/mes-chambres", response_model=List[schemas.ChambreFieldsetResponse],
+            response_model_exclude_unset=True, include_in_schema=False)
+@router.get("/", response_model=List[schemas.ChambreFieldsetResponse], response_model_exclude_unset=True)
 def read_chambres(
     skip: int = 0, 
     limit: int = 100, 
+    fieldset: Tuple[Optional[Set[str]], Optional[Set[str]]] = Depends(parse_fieldset),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Récupère la liste des chambres appartenant au propriétaire.
+    ?fields= limite les colonnes renvoyées, ?include= les relations chargées et renvoyées.
     """
-    chambres = db.query(models.Chambre).join(models.Maison).filter(models.Maison.proprietaire_id == current_user.id).offset(skip).limit(limit).all()
+    columns, relations = fieldset
+    chambres = db.query(models.Chambre).options(
+        *chambre_load_options(columns, relations)
+    ).join(models.Maison).filter(models.Maison.proprietaire_id == current_user.id).offset(skip).limit(limit).all()
     
-    return chambres
+    return [serialize_chambre(c, columns, relations) for c in chambres]
 
-@router.get("/{chambre_id}", response_model=schemas.ChambreResponse)
-def read_chambre(chambre_id: int, db: Session = Depends(get_db)):
+@router.get("/{chambre_id}", response_model=schemas.ChambreFieldsetResponse, response_model_exclude_unset=True)
+def read_chambre(
+    chambre_id: int,
+    fieldset: Tuple[Optional[Set[str]], Optional[Set[str]]] = Depends(parse_fieldset),
+    db: Session = Depends(get_db)
+):
     """
     Récupère une chambre par son ID.
+    ?fields= limite les colonnes renvoyées, ?include= les relations chargées et renvoyées.
     """
-    chambre = db.query(models.Chambre).filter(models.Chambre.id == chambre_id).first()
+    columns, relations = fieldset
+    chambre = db.query(models.Chambre).options(
+        *chambre_load_options(columns, relations)
+    ).filter(models.Chambre.id == chambre_id).first()
     if chambre is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chambre non trouvée")
-    return chambre
+    return serialize_chambre(chambre, columns, relations)
 
 @router.put("/{chambre_id}", response_model=schemas.ChambreResponse)
 def update_chambre(
     chambre_id: int, 
     chambre_update: schemas.ChambreCreate, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Met à jour une chambre existante pour la maison du propriétaire.
@@ -113,11 +214,54 @@ def update_chambre(
     db.refresh(db_chambre)
     return db_chambre
 
+@router.patch("/bulk", response_model=schemas.BulkUpdateResult)
+def bulk_update_chambres(
+    payload: schemas.ChambreBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Applique les mêmes modifications (prix, variation de prix en %, disponibilité...)
+    à une liste de chambres du propriétaire, en une seule transaction.
+    Tout ou rien : si une chambre n'appartient pas au propriétaire, rien n'est modifié.
+    """
+    changes = payload.changes.model_dump(exclude_none=True)
+    variation = changes.pop("prix_variation_pct", None)
+    if variation is not None and "prix" in changes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'prix' et 'prix_variation_pct' ne peuvent pas être utilisés ensemble."
+        )
+    if variation is not None:
+        changes["prix"] = models.Chambre.prix * (1 + variation / 100)
+    if not changes:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Aucune modification demandée.")
+
+    ids = set(payload.ids)
+    # Vérification de propriété ensembliste : une seule requête pour toutes les chambres
+    owned = {
+        chambre_id for (chambre_id,) in db.query(models.Chambre.id).join(models.Maison).filter(
+            models.Chambre.id.in_(ids),
+            models.Maison.proprietaire_id == current_user.id,
+        )
+    }
+    refused = sorted(ids - owned)
+    if refused:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Chambres introuvables ou non autorisées: {', '.join(map(str, refused))}"
+        )
+
+    # Un seul UPDATE pour toutes les chambres
+    db.query(models.Chambre).filter(models.Chambre.id.in_(ids)).update(changes, synchronize_session=False)
+    db.commit()
+    return {"modifies": sorted(ids), "ignores": []}
+
 @router.delete("/{chambre_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_chambre(
     chambre_id: int, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Supprime une chambre pour la maison du propriétaire.
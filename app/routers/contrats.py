@@ -1,11 +1,11 @@
-from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from datetime import date
     
 from app import models, schemas
 from app.database import get_db
-from app.auth.utils import get_current_user
+from app.services.pagination import PageParams, page_params, paginate_by_id
+from app.auth.utils import get_current_principal, Principal
 
 router = APIRouter(
     prefix="/contrats",
@@ -46,13 +46,13 @@ def create_contrat(contrat: schemas.ContratCreate, db: Session = Depends(get_db)
     db.refresh(db_contrat)
     return db_contrat
 
-@router.get("/", response_model=List[schemas.ContratResponse])
-def read_contrats(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=schemas.Page[schemas.ContratResponse])
+def read_contrats(page: PageParams = Depends(page_params), db: Session = Depends(get_db)):
     """
     Récupère une liste de contrats.
     """
-    contrats = db.query(models.Contrat).offset(skip).limit(limit).all()
-    return contrats
+    contrats, next_cursor = paginate_by_id(db.query(models.Contrat), page, models.Contrat.id)
+    return {"items": contrats, "next_cursor": next_cursor}
 
 @router.get("/{contrat_id}", response_model=schemas.ContratResponse)
 def read_contrat(contrat_id: int, db: Session = Depends(get_db)):
@@ -96,7 +96,7 @@ def update_contrat(contrat_id: int, contrat_update: schemas.ContratCreate, db: S
 def delete_contrat(
     contrat_id: int, 
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Supprime un contrat par son ID.
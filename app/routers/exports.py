@@ -0,0 +1,165 @@
+# app/routers/exports.py
+import csv
+import io
+import os
+from datetime import date
+from typing import Iterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app import models
+from app.database import SessionLocal
+from app.auth.utils import get_current_principal, Principal
+from app.services.json_response import dumps
+from app.services.pagination import ListFilters, apply_filters, list_filters
+from app.services.projections import Locataire
+
+router = APIRouter(
+    prefix="/proprietaire/exports",
+    tags=["Proprietaire Exports"]
+)
+
+# Nombre de lignes lues par aller-retour avec la base et écrites par morceau de réponse
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}  # charset ajouté par Starlette pour text/*
+
+LOCATAIRE_NOM = (Locataire.prenom + " " + Locataire.nom).label("locataire")
+
+# Colonnes exportées (le libellé sert d'en-tête CSV et de clé NDJSON)
+PAIEMENT_EXPORT_COLUMNS = (
+    models.Paiement.id.label("paiement_id"),
+    models.Paiement.contrat_id,
+    models.Paiement.montant,
+    models.Paiement.statut,
+    models.Paiement.date_echeance,
+    models.Paiement.date_paiement,
+    models.Paiement.cree_le,
+    models.Chambre.id.label("chambre_id"),
+    models.Chambre.titre.label("chambre"),
+    models.Maison.id.label("maison_id"),
+    models.Maison.nom.label("maison"),
+    Locataire.id.label("locataire_id"),
+    LOCATAIRE_NOM,
+    Locataire.email.label("locataire_email"),
+)
+CONTRAT_EXPORT_COLUMNS = (
+    models.Contrat.id.label("contrat_id"),
+    models.Contrat.date_debut,
+    models.Contrat.date_fin,
+    models.Contrat.montant_caution,
+    models.Contrat.mois_caution,
+    models.Contrat.mode_paiement,
+    models.Contrat.periodicite,
+    models.Contrat.statut,
+    models.Contrat.cree_le,
+    models.Chambre.id.label("chambre_id"),
+    models.Chambre.titre.label("chambre"),
+    models.Maison.id.label("maison_id"),
+    models.Maison.nom.label("maison"),
+    Locataire.id.label("locataire_id"),
+    LOCATAIRE_NOM,
+    Locataire.email.label("locataire_email"),
+)
+
+
+def export_format(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv (défaut) ou ndjson"),
+) -> str:
+    return format
+
+
+def _require_owner(current_user: Principal):
+    if current_user.role != "proprietaire":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Seuls les propriétaires peuvent exporter leurs données."
+        )
+
+
+def _stream_rows(query, format: str) -> Iterator[bytes]:
+    """
+    Exécute la requête avec un curseur serveur (yield_per) et écrit les lignes au fil
+    de leur lecture : la mémoire reste constante quelle que soit la période exportée.
+    La session est propre au flux : elle vit jusqu'au dernier morceau envoyé.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        columns = list(result.keys())
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode("utf-8")
+        else:
+            for rows in result.partitions():
+                yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+    finally:
+        db.close()
+
+
+def _export_response(query, format: str, name: str) -> StreamingResponse:
+    filename = f"{name}_{date.today():%Y%m%d}.{format}"
+    return StreamingResponse(
+        _stream_rows(query, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get(
+    "/paiements",
+    summary="Exporter (CSV ou NDJSON, en flux) les paiements des maisons du propriétaire"
+)
+def export_paiements(
+    format: str = Depends(export_format),
+    filters: ListFilters = Depends(list_filters),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """?du= / ?au= portent sur la date d'échéance ; lignes par échéance croissante."""
+    _require_owner(current_user)
+    query = (
+        select(*PAIEMENT_EXPORT_COLUMNS)
+        .select_from(models.Paiement)
+        .join(models.Contrat, models.Contrat.id == models.Paiement.contrat_id)
+        .join(models.Chambre, models.Chambre.id == models.Contrat.chambre_id)
+        .join(models.Maison, models.Maison.id == models.Chambre.maison_id)
+        .outerjoin(Locataire, Locataire.id == models.Contrat.locataire_id)
+        .where(models.Maison.proprietaire_id == current_user.id)
+    )
+    query = apply_filters(query, filters, models.Paiement.date_echeance, models.Paiement.statut)
+    query = query.order_by(models.Paiement.date_echeance, models.Paiement.id)
+    return _export_response(query, format, "paiements")
+
+
+@router.get(
+    "/contrats",
+    summary="Exporter (CSV ou NDJSON, en flux) les contrats des maisons du propriétaire"
+)
+def export_contrats(
+    format: str = Depends(export_format),
+    filters: ListFilters = Depends(list_filters),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """?du= / ?au= portent sur la date de début ; lignes par date de début croissante."""
+    _require_owner(current_user)
+    query = (
+        select(*CONTRAT_EXPORT_COLUMNS)
+        .select_from(models.Contrat)
+        .join(models.Chambre, models.Chambre.id == models.Contrat.chambre_id)
+        .join(models.Maison, models.Maison.id == models.Chambre.maison_id)
+        .outerjoin(Locataire, Locataire.id == models.Contrat.locataire_id)
+        .where(models.Maison.proprietaire_id == current_user.id)
+    )
+    query = apply_filters(query, filters, models.Contrat.date_debut, models.Contrat.statut)
+    query = query.order_by(models.Contrat.date_debut, models.Contrat.id)
+    return _export_response(query, format, "contrats")
@@ -0,0 +1,77 @@
+# app/routers/imports.py
+from typing import Dict, List
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.database import get_db
+from app.auth.utils import get_current_principal, Principal
+from app.services.bulk_import import import_csv
+
+router = APIRouter(
+    prefix="/proprietaire/imports",
+    tags=["Proprietaire Imports"]
+)
+
+
+def _require_owner(current_user: Principal):
+    if current_user.role != "proprietaire":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Seuls les propriétaires peuvent importer des biens."
+        )
+
+
+def _owned_maisons_check(owner_id: int):
+    """Contrôle ensembliste : une seule requête par morceau pour toutes les maisons référencées."""
+    def check(db: Session, rows: List[dict]) -> Dict[int, str]:
+        maison_ids = {row["maison_id"] for row in rows}
+        if not maison_ids:
+            return {}
+        owned = {
+            maison_id for (maison_id,) in db.query(models.Maison.id).filter(
+                models.Maison.id.in_(maison_ids),
+                models.Maison.proprietaire_id == owner_id,
+            )
+        }
+        return {
+            position: f"maison_id: maison {row['maison_id']} introuvable ou non autorisée"
+            for position, row in enumerate(rows) if row["maison_id"] not in owned
+        }
+    return check
+
+
+@router.post(
+    "/maisons",
+    response_model=schemas.ImportResultat,
+    summary="Importer des maisons depuis un fichier CSV (en-têtes : champs de MaisonCreate)"
+)
+def import_maisons(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    _require_owner(current_user)
+    # Comme pour create_maison, les maisons sont toujours rattachées à l'utilisateur connecté
+    return import_csv(
+        db, file.file, schemas.MaisonCreate, models.Maison,
+        overrides={"proprietaire_id": current_user.id},
+    )
+
+
+@router.post(
+    "/chambres",
+    response_model=schemas.ImportResultat,
+    summary="Importer des chambres depuis un fichier CSV (en-têtes : champs de ChambreCreate)"
+)
+def import_chambres(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    _require_owner(current_user)
+    return import_csv(
+        db, file.file, schemas.ChambreCreate, models.Chambre,
+        checks=[_owned_maisons_check(current_user.id)],
+    )
@@ -5,7 +5,9 @@ from sqlalchemy.orm import Session, joinedload
 
 from app import models, schemas
 from app.database import get_db
-from app.auth.utils import get_current_user
+from app.auth.utils import get_current_principal, Principal
+from app.services.pagination import ListFilters, PageParams, apply_filters, keyset_paginate, list_filters, page_params, split_page
+from app.services.projections import paiement_list_format, paiement_list_response, paiement_list_select, paiement_row_key
 
 router = APIRouter(
     prefix="/locataire/contrats",
@@ -73,8 +75,10 @@ def build_contrat_response(contrat: models.Contrat) -> Dict:
     summary="Récupérer tous les contrats pour le locataire connecté"
 )
 async def read_my_contrats(
+    page: PageParams = Depends(page_params),
+    filters: ListFilters = Depends(list_filters),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.role != "locataire":
         raise HTTPException(
@@ -82,13 +86,17 @@ async def read_my_contrats(
             detail="Seuls les locataires peuvent voir leurs contrats."
         )
 
-    # Chargement des contrats avec les relations nécessaires
-    contrats = db.query(models.Contrat).options(
+    # Chargement des contrats avec les relations nécessaires (relations plusieurs-à-un : LIMIT sûr)
+    query = db.query(models.Contrat).options(
         joinedload(models.Contrat.locataire),
         joinedload(models.Contrat.chambre).joinedload(models.Chambre.maison)
-    ).filter(models.Contrat.locataire_id == current_user.id).all()
+    ).filter(models.Contrat.locataire_id == current_user.id)
+    # ?du= / ?au= portent sur la date de début du contrat ; pages par date de début décroissante
+    query = apply_filters(query, filters, models.Contrat.date_debut, models.Contrat.statut)
+    contrats = keyset_paginate(query, page, models.Contrat.date_debut, models.Contrat.id).all()
 
-    return [build_contrat_response(c) for c in contrats]
+    contrats, next_cursor = split_page(contrats, page, lambda c: (c.date_debut, c.id))
+    return {"items": [build_contrat_response(c) for c in contrats], "next_cursor": next_cursor}
 
 @router.get(
     "/{contrat_id}/paiements",
@@ -96,8 +104,11 @@ async def read_my_contrats(
 )
 async def get_contract_payments(
     contrat_id: int,
+    page: PageParams = Depends(page_params),
+    filters: ListFilters = Depends(list_filters),
+    format: str = Depends(paiement_list_format),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Vérifier que le contrat appartient au locataire
     contrat = db.query(models.Contrat).options(
@@ -111,12 +122,24 @@ async def get_contract_payments(
             detail="Contrat non trouvé ou accès non autorisé"
         )
 
-    # Récupérer les paiements du contrat
-    paiements = db.query(models.Paiement).filter(
+    if format == "normalise":
+        # Le contrat, sa chambre, sa maison et le locataire ne sont renvoyés qu'une fois
+        query = paiement_list_select().where(models.Paiement.contrat_id == contrat_id)
+        query = apply_filters(query, filters, models.Paiement.date_echeance, models.Paiement.statut)
+        rows = db.execute(keyset_paginate(query, page, models.Paiement.date_echeance, models.Paiement.id)).all()
+        rows, next_cursor = split_page(rows, page, paiement_row_key)
+        return paiement_list_response(rows, format, next_cursor)
+
+    # Récupérer une page des paiements du contrat (filtres et tri appliqués en SQL)
+    query = db.query(models.Paiement).filter(
         models.Paiement.contrat_id == contrat_id
-    ).all()
+    )
+    query = apply_filters(query, filters, models.Paiement.date_echeance, models.Paiement.statut)
+    paiements = keyset_paginate(query, page, models.Paiement.date_echeance, models.Paiement.id).all()
+    paiements, next_cursor = split_page(paiements, page, lambda p: (p.date_echeance, p.id))
 
-    # Construire les réponses de paiement
+    # Construire les réponses de paiement (le contrat est construit une seule fois)
+    contrat_response = build_contrat_response(contrat)
     response_data = []
     for p in paiements:
         response_data.append({
@@ -127,6 +150,6 @@ async def get_contract_payments(
             "date_echeance": p.date_echeance,
             "date_paiement": p.date_paiement,
             "cree_le": p.cree_le,
-            "contrat": build_contrat_response(contrat)
+            "contrat": contrat_response
         })
-    return response_data
\ No newline at end of file
+    return {"items": response_data, "next_cursor": next_cursor}
\ No newline at end of file
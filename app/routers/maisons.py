@@ -1,12 +1,13 @@
 # app/routers/maisons.py
-from typing import List, Optional
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import or_ # Import for filtering
 
 from app import models, schemas 
 from app.database import get_db
-from app.auth.utils import get_current_user # Authentification via dépendance
+from app.auth.utils import get_current_principal, Principal # Authentification via dépendance
+from app.services.pagination import PageParams, page_params, paginate_by_id
 
 router = APIRouter(
     prefix="/maisons",  # Le préfixe de l'URL sera /maisons
@@ -18,7 +19,7 @@ router = APIRouter(
 def create_maison(
     maison: schemas.MaisonCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user) # L'utilisateur doit être authentifié
+    current_user: Principal = Depends(get_current_principal) # L'utilisateur doit être authentifié
 ):
     # Assurez-vous que la maison est créée par l'utilisateur authentifié.
     # On écrase le proprietaire_id du payload avec l'ID de l'utilisateur actuel.
@@ -34,10 +35,9 @@ def create_maison(
     return db_maison
 
 # --- Opération CRUD : Lire toutes les Maisons ---
-@router.get("/", response_model=List[schemas.MaisonResponse])
+@router.get("/", response_model=schemas.Page[schemas.MaisonResponse])
 def read_maisons(
-    skip: int = 0,
-    limit: int = 100,
+    page: PageParams = Depends(page_params),
     search_query: Optional[str] = None, # Pour la recherche par adresse ou description
     proprietaire_id: Optional[int] = None, # Nouveau paramètre pour filtrer par propriétaire
     db: Session = Depends(get_db)
@@ -57,8 +57,8 @@ def read_maisons(
             )
         )
 
-    maisons = query.offset(skip).limit(limit).all()
-    return maisons
+    maisons, next_cursor = paginate_by_id(query, page, models.Maison.id)
+    return {"items": maisons, "next_cursor": next_cursor}
 
 # --- Opération CRUD : Lire une Maison par ID ---
 @router.get("/{maison_id}", response_model=schemas.MaisonResponse)
@@ -77,7 +77,7 @@ def update_maison(
     maison_id: int,
     maison_update: schemas.MaisonCreate, # Utilisez MaisonCreate ou un MaisonUpdate si vous avez des champs optionnels
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user) # L'utilisateur doit être authentifié
+    current_user: Principal = Depends(get_current_principal) # L'utilisateur doit être authentifié
 ):
     db_maison = db.query(models.Maison).filter(models.Maison.id == maison_id).first()
     if db_maison is None:
@@ -108,7 +108,7 @@ def update_maison(
 def delete_maison(
     maison_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user) # L'utilisateur doit être authentifié
+    current_user: Principal = Depends(get_current_principal) # L'utilisateur doit être authentifié
 ):
     db_maison = db.query(models.Maison).filter(models.Maison.id == maison_id).first()
     if db_maison is None:
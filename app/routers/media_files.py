@@ -0,0 +1,33 @@
+# app/routers/media_files.py
+import os
+import stat as stat_module
+
+from fastapi import APIRouter, HTTPException, status
+
+from app.services.media_serving import MediaFileResponse
+from app.services.media_storage import MEDIA_ROOT
+
+router = APIRouter(
+    prefix="/uploaded_media",
+    tags=["Médias"],
+)
+
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def serve_media_file(file_path: str):
+    """
+    Sert un fichier de uploaded_media (cache immutable, ETag, requêtes Range) ;
+    remplace le montage StaticFiles.
+    """
+    root = MEDIA_ROOT.resolve()
+    path = (root / file_path).resolve()
+    # Refuser toute sortie du dossier des médias (../, liens symboliques)
+    if root not in path.parents:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fichier non trouvé")
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fichier non trouvé")
+    if not stat_module.S_ISREG(file_stat.st_mode):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fichier non trouvé")
+    return MediaFileResponse(path, file_stat)
@@ -1,78 +1,264 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status, UploadFile, File
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 import os
 from pathlib import Path
 from uuid import uuid4
 
+import anyio
+
 from app import models, schemas
 from app.database import get_db
-from app.auth.utils import get_current_user
+from app.services.media_derivatives import copy_shared_derivatives, needs_derivatives, queue_derivatives
+from app.services.media_storage import (
+    StoredUpload, acquire_blob, discard_upload, release_media_files, remove_files, save_upload,
+)
+from app.services.media_uploads import append_chunk, complete_session, create_session, delete_session, get_session
+from app.services.pagination import PageParams, page_params, paginate_by_id
+from app.auth.utils import get_current_principal, Principal
+
+# Envoi groupé (POST /medias/batch)
+MEDIA_BATCH_MAX_FILES = int(os.getenv("MEDIA_BATCH_MAX_FILES", "30"))
+MEDIA_BATCH_CONCURRENCY = int(os.getenv("MEDIA_BATCH_CONCURRENCY", "4"))
 
 router = APIRouter(
     prefix="/medias",
     tags=["Médias"],
 )
 
-@router.post("/", response_model=schemas.MediaResponse, status_code=status.HTTP_201_CREATED)
-def create_media(
-    chambre_id: int,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
-    """
-    Crée un nouveau média (photo/vidéo) pour une chambre.
-    """
-    # Vérifier que la chambre existe
+def _get_chambre_or_404(db: Session, chambre_id: int) -> models.Chambre:
     db_chambre = db.query(models.Chambre).filter(
         models.Chambre.id == chambre_id
     ).first()
-    
     if not db_chambre:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Chambre avec l'ID {chambre_id} non trouvée."
         )
+    return db_chambre
+
+def _add_media(db: Session, chambre_id: int, stored: StoredUpload, description: Optional[str] = "") -> models.Media:
+    """
+    Ajoute à la session le média d'un fichier enregistré, rattaché au fichier partagé de
+    même contenu. Ne valide pas la transaction.
+    """
+    blob = acquire_blob(db, stored)
+    db_media = models.Media(
+        chambre_id=chambre_id,
+        url=blob.chemin,
+        blob_id=blob.id,
+        type=stored.content_type,
+        description=description,
+        taille=stored.size,
+        sha256=stored.sha256,
+    )
+    if not copy_shared_derivatives(db, db_media):
+        db_media.derives_statut = "en_attente" if needs_derivatives(db_media) else None
+    db.add(db_media)
+    return db_media
 
-    # Générer un nom de fichier unique et créer le chemin
-    file_extension = file.filename.split('.')[-1]
-    unique_filename = f"{uuid4()}.{file_extension}"
-    upload_path = Path("uploaded_media")
-    upload_path.mkdir(exist_ok=True)
-    file_path = upload_path / unique_filename
+@router.post("/", response_model=schemas.MediaResponse, status_code=status.HTTP_201_CREATED)
+async def create_media(
+    chambre_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Crée un nouveau média (photo/vidéo) pour une chambre.
+    Le fichier est écrit sur disque par morceaux (voir media_storage.py).
+    """
+    # Vérifier que la chambre existe
+    _get_chambre_or_404(db, chambre_id)
 
-    # Sauvegarder le fichier
+    # Sauvegarder le fichier (taille maximale, type réel et empreinte contrôlés au fil de l'eau)
     try:
-        with file_path.open("wb") as buffer:
-            buffer.write(file.file.read())
+        stored = await save_upload(file)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur lors du téléchargement du fichier: {str(e)}"
         )
 
-    # Créer l'entrée dans la base de données
-    db_media = models.Media(
-        chambre_id=chambre_id,
-        url=str(file_path),
-        type=file.content_type,
-        description=""  # Il manquait la description
-    )
-    
-    db.add(db_media)
-    db.commit()
+    # Créer l'entrée dans la base de données, pointant vers le fichier partagé de même contenu
+    try:
+        db_media = _add_media(db, chambre_id, stored)
+        db.commit()
+    except Exception:
+        db.rollback()
+        discard_upload(stored)
+        raise
     db.refresh(db_media)
+
+    # Vignette, carte et plein écran générés en arrière-plan (pool de processus)
+    if db_media.derives_statut == "en_attente":
+        queue_derivatives([db_media])
     return db_media
 
-@router.get("/", response_model=List[schemas.MediaResponse])
-def read_medias(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def _first_http_exception(error: BaseException) -> Optional[HTTPException]:
+    if isinstance(error, HTTPException):
+        return error
+    for inner in getattr(error, "exceptions", ()):  # Groupe d'exceptions d'un task group
+        found = _first_http_exception(inner)
+        if found is not None:
+            return found
+    return None
+
+@router.post("/batch", response_model=List[schemas.MediaResponse], status_code=status.HTTP_201_CREATED)
+async def create_medias_batch(
+    chambre_id: int,
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Crée en une requête les médias de plusieurs fichiers pour une chambre
+    (photos d'une nouvelle annonce). Tout ou rien : si un fichier est refusé,
+    aucun média n'est créé.
+    """
+    if len(files) > MEDIA_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Trop de fichiers (maximum {MEDIA_BATCH_MAX_FILES} par requête)."
+        )
+    _get_chambre_or_404(db, chambre_id)
+
+    # Écriture des fichiers sur disque en parallèle ; au premier échec, les autres
+    # écritures sont annulées (fichiers partiels supprimés par save_upload)
+    stored: List[Optional[StoredUpload]] = [None] * len(files)
+    limiter = anyio.CapacityLimiter(MEDIA_BATCH_CONCURRENCY)
+
+    async def save(index: int, file: UploadFile):
+        async with limiter:
+            stored[index] = await save_upload(file)
+
+    try:
+        async with anyio.create_task_group() as task_group:
+            for index, file in enumerate(files):
+                task_group.start_soon(save, index, file)
+    except BaseException as error:
+        for upload in stored:
+            if upload is not None:
+                discard_upload(upload)
+        # Plusieurs fichiers refusés : le groupe d'exceptions devient la première erreur HTTP
+        http_error = _first_http_exception(error)
+        if http_error is not None and http_error is not error:
+            raise http_error from None
+        raise
+
+    # Une seule transaction pour tous les médias
+    try:
+        db_medias = [_add_media(db, chambre_id, upload) for upload in stored]
+        db.commit()
+    except Exception:
+        db.rollback()
+        for upload in stored:
+            discard_upload(upload)
+        raise
+    for db_media in db_medias:
+        db.refresh(db_media)
+
+    queue_derivatives([db_media for db_media in db_medias if db_media.derives_statut == "en_attente"])
+    return db_medias
+
+# --- Upload reprenable (voir media_uploads.py) ---
+# 1. POST /medias/uploads : ouvre la session (taille totale annoncée)
+# 2. PATCH /medias/uploads/{id} + en-tête Upload-Offset : envoie un morceau (corps brut)
+# 3. HEAD|GET /medias/uploads/{id} : offset atteint, pour reprendre après une coupure
+# 4. POST /medias/uploads/{id}/terminer : crée le média
+
+@router.post("/uploads", response_model=schemas.UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+def create_upload_session(
+    upload: schemas.UploadSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Ouvre une session d'upload reprenable pour un gros fichier.
+    """
+    _get_chambre_or_404(db, upload.chambre_id)
+    return create_session(db, upload.chambre_id, current_user.id, upload.taille, upload.description)
+
+@router.api_route("/uploads/{upload_id}", methods=["GET", "HEAD"], response_model=schemas.UploadSessionResponse)
+def read_upload_session(
+    upload_id: str,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Retourne l'offset atteint (aussi dans l'en-tête Upload-Offset).
+    """
+    upload = get_session(db, upload_id, current_user.id)
+    response.headers["Upload-Offset"] = str(upload.octets_recus)
+    response.headers["Upload-Length"] = str(upload.taille)
+    response.headers["Cache-Control"] = "no-store"
+    return upload
+
+@router.patch("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Ajoute un morceau au fichier, à partir de l'offset indiqué (celui retourné par la
+    session). Le corps de la requête est écrit sur disque au fur et à mesure de sa réception.
+    """
+    upload = get_session(db, upload_id, current_user.id)
+    new_offset = await append_chunk(db, upload, upload_offset, request.stream())
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"Upload-Offset": str(new_offset)})
+
+@router.post("/uploads/{upload_id}/terminer", response_model=schemas.MediaResponse, status_code=status.HTTP_201_CREATED)
+async def complete_upload_session(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Crée le média à partir du fichier entièrement reçu.
+    """
+    upload = get_session(db, upload_id, current_user.id)
+    chambre_id, description = upload.chambre_id, upload.description
+    stored = await complete_session(db, upload)
+    try:
+        db_media = _add_media(db, chambre_id, stored, description)
+        db.commit()
+    except Exception:
+        db.rollback()
+        discard_upload(stored)
+        delete_session(db, upload)  # Fichier déjà retiré de la session : elle ne peut plus aboutir
+        raise
+    db.refresh(db_media)
+
+    if db_media.derives_statut == "en_attente":
+        queue_derivatives([db_media])
+    return db_media
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+def abort_upload_session(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Abandonne une session d'upload et supprime le fichier partiel.
+    """
+    delete_session(db, get_session(db, upload_id, current_user.id))
+    return
+
+@router.get("/", response_model=schemas.Page[schemas.MediaResponse])
+def read_medias(page: PageParams = Depends(page_params), db: Session = Depends(get_db)):
     """
     Récupère une liste de médias.
     """
-    medias = db.query(models.Media).offset(skip).limit(limit).all()
-    return medias
+    medias, next_cursor = paginate_by_id(db.query(models.Media), page, models.Media.id)
+    return {"items": medias, "next_cursor": next_cursor}
 
 @router.get("/{media_id}", response_model=schemas.MediaResponse)
 def read_media(media_id: int, db: Session = Depends(get_db)):
@@ -89,7 +275,7 @@ def update_media(
     media_id: int,
     media_update: schemas.MediaCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Met à jour un média existant.
@@ -135,7 +321,7 @@ def update_media(
 def delete_media(
     media_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Supprime un média par son ID.
@@ -144,10 +330,9 @@ def delete_media(
     if db_media is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Média non trouvé")
 
-    # Supprimer le fichier physique
-    if os.path.exists(db_media.url):
-        os.remove(db_media.url)
-
+    # Le fichier (et ses déclinaisons) n'est supprimé qu'avec sa dernière référence
+    files = release_media_files(db, db_media)
     db.delete(db_media)
     db.commit()
+    remove_files(files)
     return
\ No newline at end of file
@@ -0,0 +1,16 @@
+# app/routers/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.database import engine
+from app.services.metrics import collect_runtime_stats, render_metrics
+
+router = APIRouter(tags=["Supervision"])
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """
+    Expose les métriques de l'API au format texte de Prometheus.
+    """
+    collect_runtime_stats(engine)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,13 +1,15 @@
 # app/api/endpoints/paiements.py
-from typing import List, Optional
+from typing import Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime, date
 
 from app import models, schemas
 from app.database import get_db
-from app.auth.utils import get_current_user
-from app.services.email_service import send_email
+from app.auth.utils import get_current_principal, Principal
+from app.services.outbox import enqueue_template
+from app.services.pagination import ListFilters, PageParams, apply_filters, keyset_paginate, list_filters, page_params, split_page
+from app.services.projections import paiement_list_format, paiement_list_response, paiement_list_select, paiement_row_key
 
 router = APIRouter(
     prefix="/paiements",
@@ -57,12 +59,12 @@ def build_contrat_response(contrat: models.Contrat) -> schemas.ContratResponse:
 async def create_paiement(
     paiement_in: schemas.PaiementCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Vérifier que le contrat existe
     contrat = db.query(models.Contrat).options(
         joinedload(models.Contrat.locataire),
-        joinedload(models.Contrat.chambre).joinedload(models.Chambre.maison)
+        joinedload(models.Contrat.chambre).joinedload(models.Chambre.maison).joinedload(models.Maison.proprietaire)
     ).filter(models.Contrat.id == paiement_in.contrat_id).first()
     
     if not contrat:
@@ -92,17 +94,19 @@ async def create_paiement(
     # Création du paiement
     db_paiement = models.Paiement(**paiement_in.dict())
     db.add(db_paiement)
-    db.commit()
-    db.refresh(db_paiement)
 
-    # Envoi de notification
+    # Notification mise en file dans la même transaction (envoyée par le worker d'outbox)
     if db_paiement.statut == 'paye' and contrat.chambre and contrat.chambre.maison:
-        send_email(
+        enqueue_template(
+            db,
             to_email=contrat.chambre.maison.proprietaire.email,
-            subject="Nouveau paiement reçu",
-            body=f"Paiement de {db_paiement.montant} CFA reçu pour le contrat {contrat.id}"
+            template="paiement_recu",
+            context={"montant": db_paiement.montant, "contrat_id": contrat.id},
         )
 
+    db.commit()
+    db.refresh(db_paiement)
+
     return schemas.PaiementResponse(
         id=db_paiement.id,
         contrat_id=db_paiement.contrat_id,
@@ -114,6 +118,32 @@ async def create_paiement(
         contrat=build_contrat_response(contrat)
     )
 
+@router.get(
+    "/me",
+    response_model=Union[schemas.Page[schemas.PaiementDetailResponse], schemas.PaiementNormalizedResponse]
+)
+async def get_my_payments(
+    page: PageParams = Depends(page_params),
+    filters: ListFilters = Depends(list_filters),
+    format: str = Depends(paiement_list_format),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    # Déclaré avant /{paiement_id} pour que "/me" ne soit pas interprété comme un identifiant.
+    # Projection en colonnes plates : pas d'objets ORM à hydrater ni de modèles à revalider.
+    query = paiement_list_select()
+
+    if current_user.role == "locataire":
+        query = query.where(models.Contrat.locataire_id == current_user.id)
+    elif current_user.role == "proprietaire":
+        query = query.where(models.Maison.proprietaire_id == current_user.id)
+
+    query = apply_filters(query, filters, models.Paiement.date_echeance, models.Paiement.statut)
+    rows = db.execute(keyset_paginate(query, page, models.Paiement.date_echeance, models.Paiement.id)).all()
+
+    rows, next_cursor = split_page(rows, page, paiement_row_key)
+    return paiement_list_response(rows, format, next_cursor)
+
 @router.get(
     "/{paiement_id}",
     response_model=schemas.PaiementResponse
@@ -121,7 +151,7 @@ async def create_paiement(
 async def read_paiement(
     paiement_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     paiement = db.query(models.Paiement).get(paiement_id)
     if not paiement:
@@ -155,37 +185,4 @@ async def read_paiement(
         contrat=build_contrat_response(contrat)
     )
 
-@router.get(
-    "/me",
-    response_model=List[schemas.PaiementResponse]
-)
-async def get_my_payments(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
-    query = db.query(models.Paiement).options(
-        joinedload(models.Paiement.contrat).joinedload(models.Contrat.locataire),
-        joinedload(models.Paiement.contrat).joinedload(models.Contrat.chambre).joinedload(models.Chambre.maison)
-    )
-
-    if current_user.role == "locataire":
-        paiements = query.join(models.Contrat).filter(models.Contrat.locataire_id == current_user.id).all()
-    elif current_user.role == "proprietaire":
-        paiements = query.join(models.Contrat).join(models.Chambre).filter(models.Chambre.maison.has(proprietaire_id=current_user.id)).all()
-    else:
-        paiements = query.all()
-
-    return [
-        schemas.PaiementResponse(
-            id=p.id,
-            contrat_id=p.contrat_id,
-            montant=p.montant,
-            statut=p.statut,
-            date_echeance=p.date_echeance,
-            date_paiement=p.date_paiement,
-            cree_le=p.cree_le,
-            contrat=build_contrat_response(p.contrat)
-        ) for p in paiements
-    ]
-
 # Les autres endpoints (update, mark_as_paid) suivent le même pattern
\ No newline at end of file
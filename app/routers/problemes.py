@@ -1,9 +1,9 @@
-from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app import models, schemas
 from app.database import get_db
+from app.services.pagination import PageParams, page_params, paginate_by_id
 
 router = APIRouter(
     prefix="/problemes",
@@ -29,13 +29,13 @@ def create_probleme(probleme: schemas.ProblemeCreate, db: Session = Depends(get_
     db.refresh(db_probleme)
     return db_probleme
 
-@router.get("/", response_model=List[schemas.ProblemeResponse])
-def read_problemes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=schemas.Page[schemas.ProblemeResponse])
+def read_problemes(page: PageParams = Depends(page_params), db: Session = Depends(get_db)):
     """
     Récupère une liste de problèmes.
     """
-    problemes = db.query(models.Probleme).offset(skip).limit(limit).all()
-    return problemes
+    problemes, next_cursor = paginate_by_id(db.query(models.Probleme), page, models.Probleme.id)
+    return {"items": problemes, "next_cursor": next_cursor}
 
 @router.get("/{probleme_id}", response_model=schemas.ProblemeResponse)
 def read_probleme(probleme_id: int, db: Session = Depends(get_db)):
@@ -1,27 +1,35 @@
 # app/api/endpoints/proprietaire_paiements.py
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from typing import Union
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, case, func, not_, select
+from sqlalchemy.orm import Session
 from datetime import datetime, date, timedelta
 
 from app import models, schemas
 from app.database import get_db
-from app.auth.utils import get_current_user
-from app.routers.locataire_contrats import build_contrat_response # Réutiliser la fonction existante
+from app.auth.utils import get_current_principal, Principal
+from app.services.pagination import ListFilters, PageParams, apply_filters, keyset_paginate, list_filters, page_params, split_page
+from app.services.projections import paiement_list_format, paiement_list_response, paiement_list_select, paiement_row_key
 
 router = APIRouter(
     prefix="/proprietaire/paiements",
     tags=["Proprietaire Paiements"]
 )
 
+# Statuts considérés comme encaissés (les deux graphies existent en base)
+PAID_STATUSES = ("paye", "payé")
+
 @router.get(
     "/",
-    response_model=List[schemas.PaiementDetailResponse],
+    response_model=Union[schemas.Page[schemas.PaiementDetailResponse], schemas.PaiementNormalizedResponse],
     summary="Récupérer tous les paiements pour les maisons du propriétaire connecté"
 )
 async def get_my_properties_payments(
+    page: PageParams = Depends(page_params),
+    filters: ListFilters = Depends(list_filters),
+    format: str = Depends(paiement_list_format),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.role != "proprietaire":
         raise HTTPException(
@@ -29,60 +37,26 @@ async def get_my_properties_payments(
             detail="Seuls les propriétaires peuvent voir les paiements de leurs maisons."
         )
 
-    # Récupérer les paiements associés aux contrats des chambres appartenant aux maisons du propriétaire
-    paiements = db.query(models.Paiement).options(
-        joinedload(models.Paiement.contrat)
-        .joinedload(models.Contrat.locataire),
-        joinedload(models.Paiement.contrat)
-        .joinedload(models.Contrat.chambre)
-        .joinedload(models.Chambre.maison)
-    ).join(
-        models.Contrat
-    ).join(
-        models.Chambre
-    ).join(
-        models.Maison
-    ).filter(
-        models.Maison.proprietaire_id == current_user.id
-    ).all()
+    # Récupérer les paiements associés aux contrats des chambres appartenant aux maisons du propriétaire.
+    # Projection en colonnes plates : pas d'objets ORM à hydrater ni de modèles à revalider.
+    # Filtres et pagination (par échéance décroissante) sont appliqués en SQL.
+    query = paiement_list_select().where(models.Maison.proprietaire_id == current_user.id)
+    query = apply_filters(query, filters, models.Paiement.date_echeance, models.Paiement.statut)
+    rows = db.execute(keyset_paginate(query, page, models.Paiement.date_echeance, models.Paiement.id)).all()
 
-    return [
-        schemas.PaiementDetailResponse(
-            id=p.id,
-            contrat_id=p.contrat_id,
-            montant=p.montant,
-            statut=p.statut,
-            date_echeance=p.date_echeance,
-            date_paiement=p.date_paiement,
-            cree_le=p.cree_le,
-            contrat=schemas.ContratResponse.from_orm(p.contrat),
-            chambre=schemas.ChambreResponse(
-                id=p.contrat.chambre.id,
-                cree_le=p.contrat.chambre.cree_le,
-                maison_id=p.contrat.chambre.maison_id,
-                titre=p.contrat.chambre.titre,
-                description=p.contrat.chambre.description,
-                taille=p.contrat.chambre.taille,
-                type=p.contrat.chambre.type,
-                meublee=p.contrat.chambre.meublee,
-                prix=p.contrat.chambre.prix,
-                capacite=p.contrat.chambre.capacite,
-                salle_de_bain=p.contrat.chambre.salle_de_bain,
-                disponible=p.contrat.chambre.disponible,
-                maison=schemas.MaisonResponse.from_orm(p.contrat.chambre.maison)
-            ),
-            locataire=schemas.SimpleUserResponse.from_orm(p.contrat.locataire)
-        ) for p in paiements
-    ]
+    rows, next_cursor = split_page(rows, page, paiement_row_key)
+    return paiement_list_response(rows, format, next_cursor)
 
 @router.get(
     "/pending-this-month",
-    response_model=List[schemas.PaiementDetailResponse],
+    response_model=Union[schemas.Page[schemas.PaiementDetailResponse], schemas.PaiementNormalizedResponse],
     summary="Récupérer les paiements en attente pour le mois en cours pour les maisons du propriétaire"
 )
 async def get_pending_payments_this_month(
+    page: PageParams = Depends(page_params),
+    format: str = Depends(paiement_list_format),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.role != "proprietaire":
         raise HTTPException(
@@ -96,50 +70,116 @@ async def get_pending_payments_this_month(
 
 
     # Récupérer les paiements en attente pour le mois en cours pour les maisons du propriétaire
-    paiements_en_attente = db.query(models.Paiement).options(
-        joinedload(models.Paiement.contrat)
-        .joinedload(models.Contrat.locataire),
-        joinedload(models.Paiement.contrat)
-        .joinedload(models.Contrat.chambre)
-        .joinedload(models.Chambre.maison)
-    ).join(
-        models.Contrat
-    ).join(
-        models.Chambre
-    ).join(
-        models.Maison
-    ).filter(
+    query = paiement_list_select().where(
         models.Maison.proprietaire_id == current_user.id,
         models.Paiement.statut == 'en_attente',
         models.Paiement.date_echeance >= first_day_of_month,
         models.Paiement.date_echeance <= last_day_of_month
+    )
+    rows = db.execute(keyset_paginate(query, page, models.Paiement.date_echeance, models.Paiement.id)).all()
+
+    rows, next_cursor = split_page(rows, page, paiement_row_key)
+    return paiement_list_response(rows, format, next_cursor)
+
+
+# --- Tableau de bord : agrégats calculés par la base (GROUP BY) ---
+
+def _month_expr(db: Session, column):
+    """Expression SQL 'AAAA-MM' pour une colonne date, selon le dialecte."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m", column)
+    return func.to_char(column, "YYYY-MM")
+
+def _totaux(row) -> dict:
+    du, encaisse = float(row.du or 0), float(row.encaisse or 0)
+    return {"du": du, "encaisse": encaisse, "reste": du - encaisse, "nombre": row.nombre}
+
+@router.get(
+    "/resume",
+    response_model=schemas.PaiementResumeResponse,
+    summary="Résumé des paiements du propriétaire : dû/encaissé par mois, maison et chambre, retards"
+)
+def get_payments_summary(
+    mois: int = Query(12, ge=1, le=120, description="Nombre de mois (en comptant le mois courant) du détail mensuel"),
+    top: int = Query(5, ge=1, le=50, description="Nombre de locataires en retard à renvoyer"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    if current_user.role != "proprietaire":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Seuls les propriétaires peuvent voir le résumé de leurs paiements."
+        )
+
+    today = date.today()
+    paid = models.Paiement.statut.in_(PAID_STATUSES)
+    overdue = and_(not_(paid), models.Paiement.date_echeance < today)
+    du = func.sum(models.Paiement.montant).label("du")
+    encaisse = func.sum(case((paid, models.Paiement.montant), else_=0)).label("encaisse")
+    nombre = func.count(models.Paiement.id).label("nombre")
+
+    def owner_select(*columns):
+        # Paiements des chambres des maisons du propriétaire ; seules les colonnes agrégées sont lues
+        return (
+            select(*columns)
+            .select_from(models.Paiement)
+            .join(models.Contrat, models.Contrat.id == models.Paiement.contrat_id)
+            .join(models.Chambre, models.Chambre.id == models.Contrat.chambre_id)
+            .join(models.Maison, models.Maison.id == models.Chambre.maison_id)
+            .where(models.Maison.proprietaire_id == current_user.id)
+        )
+
+    # Totaux et retards en une seule passe
+    totals = db.execute(owner_select(
+        du, encaisse, nombre,
+        func.sum(case((overdue, 1), else_=0)).label("retards_nombre"),
+        func.sum(case((overdue, models.Paiement.montant), else_=0)).label("retards_montant"),
+    )).one()
+
+    # Détail mensuel (mois d'échéance) sur les `mois` derniers mois
+    month_index = today.year * 12 + today.month - mois
+    first_month = date(month_index // 12, month_index % 12 + 1, 1)
+    month = _month_expr(db, models.Paiement.date_echeance).label("mois")
+    par_mois = db.execute(
+        owner_select(month, du, encaisse, nombre)
+        .where(models.Paiement.date_echeance >= first_month)
+        .group_by(month).order_by(month)
+    ).all()
+
+    par_maison = db.execute(
+        owner_select(models.Maison.id, models.Maison.nom, du, encaisse, nombre)
+        .group_by(models.Maison.id, models.Maison.nom).order_by(models.Maison.id)
+    ).all()
+
+    par_chambre = db.execute(
+        owner_select(models.Chambre.id, models.Chambre.maison_id, models.Chambre.titre, du, encaisse, nombre)
+        .group_by(models.Chambre.id, models.Chambre.maison_id, models.Chambre.titre).order_by(models.Chambre.id)
+    ).all()
+
+    montant_retard = func.sum(models.Paiement.montant).label("montant")
+    locataires = db.execute(
+        owner_select(
+            models.User.id, models.User.prenom, models.User.nom,
+            func.count(models.Paiement.id).label("nombre"), montant_retard,
+        )
+        .join(models.User, models.User.id == models.Contrat.locataire_id)
+        .where(overdue)
+        .group_by(models.User.id, models.User.prenom, models.User.nom)
+        .order_by(montant_retard.desc())
+        .limit(top)
     ).all()
 
-    return [
-        schemas.PaiementDetailResponse(
-            id=p.id,
-            contrat_id=p.contrat_id,
-            montant=p.montant,
-            statut=p.statut,
-            date_echeance=p.date_echeance,
-            date_paiement=p.date_paiement,
-            cree_le=p.cree_le,
-            contrat=schemas.ContratResponse.from_orm(p.contrat),
-            chambre=schemas.ChambreResponse(
-                id=p.contrat.chambre.id,
-                cree_le=p.contrat.chambre.cree_le,
-                maison_id=p.contrat.chambre.maison_id,
-                titre=p.contrat.chambre.titre,
-                description=p.contrat.chambre.description,
-                taille=p.contrat.chambre.taille,
-                type=p.contrat.chambre.type,
-                meublee=p.contrat.chambre.meublee,
-                prix=p.contrat.chambre.prix,
-                capacite=p.contrat.chambre.capacite,
-                salle_de_bain=p.contrat.chambre.salle_de_bain,
-                disponible=p.contrat.chambre.disponible,
-                maison=schemas.MaisonResponse.from_orm(p.contrat.chambre.maison)
-            ),
-            locataire=schemas.SimpleUserResponse.from_orm(p.contrat.locataire)
-        ) for p in paiements_en_attente
-    ]
\ No newline at end of file
+    return {
+        "totaux": _totaux(totals),
+        "retards": {"nombre": totals.retards_nombre or 0, "montant": float(totals.retards_montant or 0)},
+        "par_mois": [{"mois": row.mois, **_totaux(row)} for row in par_mois],
+        "par_maison": [{"maison_id": row.id, "nom": row.nom, **_totaux(row)} for row in par_maison],
+        "par_chambre": [
+            {"chambre_id": row.id, "maison_id": row.maison_id, "titre": row.titre, **_totaux(row)}
+            for row in par_chambre
+        ],
+        "locataires_en_retard": [
+            {"locataire_id": row.id, "nom": f"{row.prenom} {row.nom}", "nombre": row.nombre, "montant": float(row.montant)}
+            for row in locataires
+        ],
+    }
@@ -1,158 +1,27 @@
 # app/routers/rendez_vous.py
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
 from app import models, schemas
 from app.database import get_db
-from app.services.email_service import send_email
-from app.auth.utils import get_current_user
+from app.services.notifications import notify_owner, notify_tenant, rendez_vous_contexts
+from app.auth.utils import get_current_principal, Principal
+from app.services.projections import (
+    RENDEZ_VOUS_LIST_ADAPTER, build_rendez_vous_item, list_response, rendez_vous_list_select,
+)
 
 router = APIRouter(
     prefix="/rendez-vous",
     tags=["Rendez-vous"],
 )
 
-# --- (Your existing generate_email_body and generate_owner_notification functions) ---
-def generate_email_body(rdv: models.RendezVous, statut: str):
-    locataire_nom = f"{rdv.locataire.prenom} {rdv.locataire.nom}" if rdv.locataire else "Cher locataire"
-    proprietaire_nom = f"{rdv.chambre.maison.proprietaire.prenom} {rdv.chambre.maison.proprietaire.nom}" if rdv.chambre and rdv.chambre.maison and rdv.chambre.maison.proprietaire else "Le propriétaire"
-    chambre_titre = rdv.chambre.titre if rdv.chambre else "une chambre"
-    adresse_chambre = rdv.chambre.maison.adresse if rdv.chambre and rdv.chambre.maison else "non spécifiée"
-
-    if statut == "confirmé":
-        subject = f"Rendez-vous confirmé: {chambre_titre} - {rdv.date_heure.strftime('%d/%m/%Y à %H:%M')}"
-        html_content = f"""
-        <html>
-        <body>
-            <p>Bonjour {locataire_nom},</p>
-            <p>Votre rendez-vous pour la chambre <strong>'{chambre_titre}'</strong> a été confirmé.</p>
-            <p><strong>Détails :</strong></p>
-            <ul>
-                <li>Date: {rdv.date_heure.strftime('%d/%m/%Y à %H:%M')}</li>
-                <li>Adresse: {adresse_chambre}</li>
-                <li>Propriétaire: {proprietaire_nom}</li>
-            </ul>
-            <p>Présentez-vous à l'adresse indiquée à l'heure convenue.</p>
-            <p>Cordialement,<br>L'équipe Immobilière</p>
-        </body>
-        </html>
-        """
-    elif statut == "annulé":
-        subject = f"Rendez-vous annulé: {chambre_titre}"
-        html_content = f"""
-        <html>
-        <body>
-            <p>Bonjour {locataire_nom},</p>
-            <p>Votre rendez-vous prévu pour le {rdv.date_heure.strftime('%d/%m/%Y à %H:%M')} a été annulé.</p>
-            <p><strong>Chambre :</strong> {chambre_titre}</p>
-            <p><strong>Adresse :</strong> {adresse_chambre}</p>
-            <p>Veuillez nous excuser pour tout inconvénient.</p>
-            <p>Cordialement,<br>L'équipe Immobilière</p>
-        </body>
-        </html>
-        """
-    elif statut == "en_attente":
-        subject = f"Demande de rendez-vous pour: {chambre_titre}"
-        html_content = f"""
-        <html>
-        <body>
-            <p>Bonjour {locataire_nom},</p>
-            <p>Votre demande de rendez-vous pour la chambre <strong>'{chambre_titre}'</strong> a été enregistrée.</p>
-            <p><strong>Date proposée :</strong> {rdv.date_heure.strftime('%d/%m/%Y à %H:%M')}</p>
-            <p>Le propriétaire sera informé et vous recevrez une confirmation sous peu.</p>
-            <p>Cordialement,<br>L'équipe Immobilière</p>
-        </body>
-        </html>
-        """
-    else:
-        subject = f"Mise à jour de votre rendez-vous pour: {chambre_titre}"
-        html_content = f"""
-        <html>
-        <body>
-            <p>Bonjour {locataire_nom},</p>
-            <p>Le statut de votre rendez-vous pour la chambre '{chambre_titre}' a été mis à jour.</p>
-            <p>Nouveau statut : <strong>{statut}</strong></p>
-            <p>Cordialement,<br>L'équipe Immobilière</p>
-        </body>
-        </html>
-        """
-    
-    return subject, html_content
-
-def generate_owner_notification(rdv: models.RendezVous, action: str):
-    proprietaire_nom = f"{rdv.chambre.maison.proprietaire.prenom} {rdv.chambre.maison.proprietaire.nom}"
-    locataire_nom = f"{rdv.locataire.prenom} {rdv.locataire.nom}"
-    chambre_titre = rdv.chambre.titre
-    adresse_chambre = rdv.chambre.maison.adresse
-
-    if action == "creation":
-        subject = f"Nouvelle demande de rendez-vous: {chambre_titre}"
-        html_content = f"""
-        <html>
-        <body>
-            <p>Bonjour {proprietaire_nom},</p>
-            <p>Vous avez une nouvelle demande de rendez-vous pour votre chambre :</p>
-            <p><strong>{chambre_titre}</strong> - {adresse_chambre}</p>
-            <p><strong>Locataire :</strong> {locataire_nom}</p>
-            <p><strong>Date proposée :</strong> {rdv.date_heure.strftime('%d/%m/%Y à %H:%M')}</p>
-            <p><strong>Contact :</strong> {rdv.locataire.telephone or 'Non renseigné'}</p>
-            <p>Veuillez confirmer ou annuler ce rendez-vous dans votre espace propriétaire.</p>
-            <p>Cordialement,<br>L'équipe Immobilière</p>
-        </body>
-        </html>
-        """
-    elif action == "modification_date":
-        subject = f"Modification de rendez-vous: {chambre_titre}"
-        html_content = f"""
-        <html>
-        <body>
-            <p>Bonjour {proprietaire_nom},</p>
-            <p>Le locataire a modifié la date du rendez-vous pour votre chambre :</p>
-            <p><strong>{chambre_titre}</strong> - {adresse_chambre}</p>
-            <p><strong>Nouvelle date proposée :</strong> {rdv.date_heure.strftime('%d/%m/%Y à %H:%M')}</p>
-            <p>Veuillez confirmer ou annuler ce nouveau créneau.</p>
-            <p>Cordialement,<br>L'équipe Immobilière</p>
-        </body>
-        </html>
-        """
-    elif action == "annulation_locataire":
-        subject = f"Annulation de rendez-vous: {chambre_titre}"
-        html_content = f"""
-        <html>
-        <body>
-            <p>Bonjour {proprietaire_nom},</p>
-            <p>Le locataire a annulé le rendez-vous pour votre chambre :</p>
-            <p><strong>{chambre_titre}</strong> - {adresse_chambre}</p>
-            <p><strong>Date prévue :</strong> {rdv.date_heure.strftime('%d/%m/%Y à %H:%M')}</p>
-            <p>Cordialement,<br>L'équipe Immobilière</p>
-        </body>
-        </html>
-        """
-    else:  # annulation_proprietaire
-        subject = f"Rendez-vous annulé: {chambre_titre}"
-        html_content = f"""
-        <html>
-        <body>
-            <p>Bonjour {proprietaire_nom},</p>
-            <p>Vous avez annulé le rendez-vous pour votre chambre :</p>
-            <p><strong>{chambre_titre}</strong> - {adresse_chambre}</p>
-            <p><strong>Date prévue :</strong> {rdv.date_heure.strftime('%d/%m/%Y à %H:%M')}</p>
-            <p>Le locataire a été notifié de cette annulation.</p>
-            <p>Cordialement,<br>L'équipe Immobilière</p>
-        </body>
-        </html>
-        """
-    
-    return subject, html_content
-
 # --- (Your existing create_rendez_vous route) ---
 @router.post("/", response_model=schemas.RendezVousResponse, status_code=status.HTTP_201_CREATED)
 def create_rendez_vous(
     rdv: schemas.RendezVousCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Vérifier que l'utilisateur est un locataire
     if current_user.role != "locataire":
@@ -208,32 +77,25 @@ def create_rendez_vous(
         statut="en_attente"
     )
     db.add(db_rdv)
-    db.commit()
-    
-    # Recharger le rendez-vous avec toutes les relations
-    db_rdv = db.query(models.RendezVous).filter(models.RendezVous.id == db_rdv.id).first()
-
-    if not db_rdv:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Erreur lors du chargement du rendez-vous"
-        )
+    db.flush()
+    # Données des notifications en une requête ; le rendu est fait par le worker
+    context = rendez_vous_contexts(db, [db_rdv.id])[db_rdv.id]
 
     # Envoyer email au locataire
-    subject, html_body = generate_email_body(db_rdv, "en_attente")
-    background_tasks.add_task(send_email, current_user.email, subject, html_body, html_body)
+    notify_tenant(db, context, "en_attente")
 
     # Envoyer notification au propriétaire
-    if db_rdv.chambre.maison and db_rdv.chambre.maison.proprietaire:
-        owner_email = db_rdv.chambre.maison.proprietaire.email
-        owner_subject, owner_html = generate_owner_notification(db_rdv, "creation")
-        background_tasks.add_task(send_email, owner_email, owner_subject, owner_html, owner_html)
+    if context["proprietaire_email"]:
+        notify_owner(db, context, "creation")
     else:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="La maison ou le propriétaire associé à la chambre n'a pas été trouvé"
         )
 
+    # Le rendez-vous et ses notifications sont validés ensemble
+    db.commit()
+
     # Assurez-vous que la réponse contient toutes les relations nécessaires
     return schemas.RendezVousResponse(
         id=db_rdv.id,
@@ -281,25 +143,18 @@ def read_rendez_vous(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=200),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
-    # Construire la requête de base avec les relations
-    query = db.query(models.RendezVous).options(
-        joinedload(models.RendezVous.locataire),
-        joinedload(models.RendezVous.chambre)
-        .joinedload(models.Chambre.maison)
-        .joinedload(models.Maison.proprietaire)
-    )
+    # Projection en colonnes plates (locataire, chambre, maison) : pas d'objets ORM à hydrater
+    query = rendez_vous_list_select()
 
     # Appliquer les filtres selon le rôle
     if current_user.role == "proprietaire":
         # Propriétaire : voir les RDV de ses chambres
-        query = query.join(models.Chambre).join(models.Maison).filter(
-            models.Maison.proprietaire_id == current_user.id
-        )
+        query = query.where(models.Maison.proprietaire_id == current_user.id)
     elif current_user.role == "locataire":
         # Locataire : voir ses propres RDV
-        query = query.filter(models.RendezVous.locataire_id == current_user.id)
+        query = query.where(models.RendezVous.locataire_id == current_user.id)
     else:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -313,64 +168,89 @@ def read_rendez_vous(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Statut de filtre invalide"
             )
-        query = query.filter(models.RendezVous.statut == statut)
+        query = query.where(models.RendezVous.statut == statut)
 
     # Exécuter la requête
-    rdvs = query.offset(skip).limit(limit).all()
+    rows = db.execute(query.offset(skip).limit(limit)).all()
     
-    # Construire les réponses avec le bon schéma
-    return [
-        schemas.RendezVousResponse(
-            id=rdv.id,
-            locataire_id=rdv.locataire_id,
-            chambre_id=rdv.chambre_id,
-            date_heure=rdv.date_heure,
-            statut=rdv.statut,
-            cree_le=rdv.cree_le,
-            locataire=schemas.SimpleUserResponse(
-                id=rdv.locataire.id,
-                nom=f"{rdv.locataire.prenom} {rdv.locataire.nom}",
-                email=rdv.locataire.email
-            ) if rdv.locataire else None,
-            chambre=schemas.ChambreResponse(
-                id=rdv.chambre.id,
-                maison_id=rdv.chambre.maison_id,
-                titre=rdv.chambre.titre,
-                description=rdv.chambre.description,
-                taille=rdv.chambre.taille,
-                type=rdv.chambre.type,
-                meublee=rdv.chambre.meublee,
-                prix=rdv.chambre.prix,
-                capacite=rdv.chambre.capacite,
-                salle_de_bain=rdv.chambre.salle_de_bain,
-                disponible=rdv.chambre.disponible,
-                cree_le=rdv.chambre.cree_le,
-                maison=schemas.MaisonResponse(
-                    id=rdv.chambre.maison.id,
-                    proprietaire_id=rdv.chambre.maison.proprietaire_id,
-                    nom=rdv.chambre.maison.nom,
-                    adresse=rdv.chambre.maison.adresse,
-                    ville=rdv.chambre.maison.ville,
-                    superficie=rdv.chambre.maison.superficie,
-                    latitude=rdv.chambre.maison.latitude,
-                    longitude=rdv.chambre.maison.longitude,
-                    description=rdv.chambre.maison.description,
-                    cree_le=rdv.chambre.maison.cree_le
-                )
-            ) if rdv.chambre else None
-        )
-        for rdv in rdvs
-    ]
+    # Construire les réponses sans revalidation (données issues de la base)
+    return list_response(RENDEZ_VOUS_LIST_ADAPTER, [build_rendez_vous_item(row) for row in rows])
 
 # --- (Your existing update_rendez_vous and delete_rendez_vous routes) ---
 
+@router.patch("/bulk", response_model=schemas.BulkUpdateResult)
+def bulk_update_rendez_vous(
+    payload: schemas.RendezVousBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Confirme ou annule en une fois une liste de rendez-vous des chambres du propriétaire.
+    Les rendez-vous dont l'état ne permet pas la transition sont ignorés (et listés).
+    """
+    if current_user.role != "proprietaire":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Seuls les propriétaires peuvent modifier des rendez-vous en masse"
+        )
+    if payload.statut not in ["confirmé", "annulé"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Action invalide pour un propriétaire"
+        )
+
+    # Vérification de propriété ensembliste : une seule requête pour tous les rendez-vous
+    ids = set(payload.ids)
+    current = dict(
+        db.query(models.RendezVous.id, models.RendezVous.statut)
+        .join(models.Chambre, models.Chambre.id == models.RendezVous.chambre_id)
+        .join(models.Maison, models.Maison.id == models.Chambre.maison_id)
+        .filter(models.RendezVous.id.in_(ids), models.Maison.proprietaire_id == current_user.id)
+        .all()
+    )
+    refused = sorted(ids - current.keys())
+    if refused:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Rendez-vous introuvables ou non autorisés: {', '.join(map(str, refused))}"
+        )
+
+    # Mêmes règles que update_rendez_vous : seuls les rendez-vous en attente peuvent être confirmés
+    if payload.statut == "confirmé":
+        allowed_from, reason = ["en_attente"], "Seuls les rendez-vous en attente peuvent être confirmés"
+    else:
+        allowed_from, reason = ["en_attente", "confirmé"], "Rendez-vous déjà annulé"
+    eligible = sorted(rdv_id for rdv_id, statut in current.items() if statut in allowed_from)
+    ignored = [{"id": rdv_id, "raison": reason} for rdv_id in sorted(ids) if current[rdv_id] not in allowed_from]
+
+    modified = []
+    if eligible:
+        # Un seul UPDATE ; la condition sur le statut protège des modifications concurrentes
+        db.query(models.RendezVous).filter(
+            models.RendezVous.id.in_(eligible),
+            models.RendezVous.statut.in_(allowed_from),
+        ).update({"statut": payload.statut}, synchronize_session=False)
+
+        # Notifications (mêmes que update_rendez_vous) : données lues en une requête pour
+        # tout le lot, mises en file dans la même transaction que la mise à jour.
+        # Seuls les rendez-vous effectivement modifiés par l'UPDATE sont notifiés et retournés.
+        for rdv_id, context in sorted(rendez_vous_contexts(db, eligible).items()):
+            if context["statut"] != payload.statut:
+                continue
+            modified.append(rdv_id)
+            notify_tenant(db, context, payload.statut)
+            if payload.statut == "annulé":
+                notify_owner(db, context, "annulation_proprietaire")
+        db.commit()
+
+    return {"modifies": modified, "ignores": ignored}
+
 @router.put("/{rdv_id}", response_model=schemas.RendezVousResponse)
 def update_rendez_vous(
     rdv_id: int,
     rdv_update: schemas.RendezVousUpdate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Charger le rendez-vous avec toutes les relations nécessaires
     db_rdv = db.query(models.RendezVous).options(
@@ -410,6 +290,7 @@ def update_rendez_vous(
         )
 
     # LOGIQUE DE MISE À JOUR
+    tenant_statut = owner_action = None
     # Propriétaire : peut confirmer ou annuler
     if is_owner:
         if rdv_update.date_heure:
@@ -433,18 +314,13 @@ def update_rendez_vous(
                 )
             db_rdv.statut = "confirmé"
             # Envoyer email au locataire
-            subject, html_body = generate_email_body(db_rdv, "confirmé")
-            background_tasks.add_task(send_email, db_rdv.locataire.email, subject, html_body, html_body)
+            tenant_statut = "confirmé"
             
         # Annulation
         elif rdv_update.statut == "annulé":
             db_rdv.statut = "annulé"
-            # Envoyer email au locataire
-            subject, html_body = generate_email_body(db_rdv, "annulé")
-            background_tasks.add_task(send_email, db_rdv.locataire.email, subject, html_body, html_body)
-            # Notification au propriétaire
-            owner_subject, owner_html = generate_owner_notification(db_rdv, "annulation_proprietaire")
-            background_tasks.add_task(send_email, current_user.email, owner_subject, owner_html, owner_html)
+            # Envoyer email au locataire et notification au propriétaire
+            tenant_statut, owner_action = "annulé", "annulation_proprietaire"
     
     # Locataire : peut modifier la date
     elif is_tenant:
@@ -471,12 +347,16 @@ def update_rendez_vous(
         db_rdv.statut = "en_attente"  # Retour en attente de confirmation
         
         # Envoyer notification au propriétaire
-        owner_email = db_rdv.chambre.maison.proprietaire.email
-        owner_subject, owner_html = generate_owner_notification(db_rdv, "modification_date")
-        background_tasks.add_task(send_email, owner_email, owner_subject, owner_html, owner_html)
+        owner_action = "modification_date"
 
-    # Sauvegarder les modifications
+    # Sauvegarder les modifications et mettre les notifications en file dans la même transaction
     db.add(db_rdv)
+    db.flush()
+    context = rendez_vous_contexts(db, [rdv_id])[rdv_id]
+    if tenant_statut:
+        notify_tenant(db, context, tenant_statut)
+    if owner_action:
+        notify_owner(db, context, owner_action)
     db.commit()
     db.refresh(db_rdv)
     
@@ -524,9 +404,8 @@ def update_rendez_vous(
 @router.delete("/{rdv_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_rendez_vous(
     rdv_id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Charger le rendez-vous avec les relations
     db_rdv = db.query(models.RendezVous).options(
@@ -565,22 +444,17 @@ def delete_rendez_vous(
             detail="Action non autorisée"
         )
 
-    # PRÉPARER LES NOTIFICATIONS
+    # PRÉPARER LES NOTIFICATIONS (données lues avant la suppression)
+    context = rendez_vous_contexts(db, [rdv_id])[rdv_id]
     if is_owner:
         # Propriétaire supprime → notifier locataire
-        recipient = db_rdv.locataire.email
-        subject, html_content = generate_email_body(db_rdv, "annulé")
+        notify_tenant(db, context, "annulé")
         # Notification au propriétaire
-        owner_subject, owner_html = generate_owner_notification(db_rdv, "annulation_proprietaire")
-        background_tasks.add_task(send_email, current_user.email, owner_subject, owner_html, owner_html)
+        notify_owner(db, context, "annulation_proprietaire")
         
     elif is_tenant:
         # Locataire supprime → notifier propriétaire
-        recipient = db_rdv.chambre.maison.proprietaire.email
-        subject, html_content = generate_owner_notification(db_rdv, "annulation_locataire")
-    
-    # Envoyer la notification
-    background_tasks.add_task(send_email, recipient, subject, html_content, html_content)
+        notify_owner(db, context, "annulation_locataire")
 
     # Supprimer le rendez-vous
     db.delete(db_rdv)
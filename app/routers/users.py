@@ -1,10 +1,11 @@
-from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 from app import models, schemas
 from app.database import get_db
+from app.services.pagination import PageParams, page_params, paginate_by_id
+from app.auth.utils import invalidate_user_principal
 
 router = APIRouter(
     prefix="/users",  # Le préfixe de l'URL sera /users
@@ -47,13 +48,13 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
 
 
-@router.get("/", response_model=List[schemas.UserResponse])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=schemas.Page[schemas.UserResponse])
+def read_users(page: PageParams = Depends(page_params), db: Session = Depends(get_db)):
     """
     Récupère une liste d'utilisateurs.
     """
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+    users, next_cursor = paginate_by_id(db.query(models.User), page, models.User.id)
+    return {"items": users, "next_cursor": next_cursor}
 
 @router.get("/{user_id}", response_model=schemas.UserResponse)
 def read_user(user_id: int, db: Session = Depends(get_db)):
@@ -90,6 +91,8 @@ def update_user(user_id: int, user_update: schemas.UserCreate, db: Session = Dep
         else:
             setattr(db_user, field, value)
 
+    # Les tokens déjà émis portent peut-être un rôle/email obsolète
+    invalidate_user_principal(user_id, db_user)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
@@ -105,4 +108,5 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Utilisateur non trouvé")
     db.delete(db_user)
     db.commit()
+    invalidate_user_principal(user_id)
     return # Pas de contenu en cas de suppression réussie
\ No newline at end of file
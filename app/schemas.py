@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import Optional, List, ForwardRef
+from typing import Any, Optional, List, Dict, ForwardRef, Generic, TypeVar
 from pydantic import BaseModel, EmailStr, Field
 from fastapi import UploadFile
 from app.models import User
@@ -104,6 +104,8 @@ class ChambreMediaSchema(BaseModel):
     url: str
     description: Optional[str] = None
     est_principale: bool = False
+    apercu: Optional[str] = None
+    derives: Optional[Dict[str, Dict[str, Any]]] = None
 
     class Config:
         from_attributes = True
@@ -379,6 +381,29 @@ class ChambreResponse(ChambreBase):
         from_attributes = True
         exclude = {'medias', 'contrats', 'rendezvous'}
 
+# Chambre partielle (?fields= / ?include=) : mêmes champs que ChambreResponse, tous
+# optionnels ; renvoyée avec response_model_exclude_unset, seuls les champs fournis apparaissent
+class ChambreFieldsetResponse(BaseModel):
+    maison_id: Optional[int] = None
+    titre: Optional[str] = None
+    description: Optional[str] = None
+    taille: Optional[str] = None
+    type: Optional[str] = None
+    meublee: Optional[bool] = None
+    prix: Optional[float] = None
+    capacite: Optional[int] = None
+    salle_de_bain: Optional[bool] = None
+    disponible: Optional[bool] = None
+    id: int
+    cree_le: Optional[datetime] = None
+    maison: Optional[MaisonResponse] = None
+    contrats: Optional[list[ContratResponse]] = None
+    medias: Optional[list[MediaResponse]] = None
+    rendezvous: Optional[list[RendezVousResponse]] = None
+
+    class Config:
+        from_attributes = True
+
 # --- Contract Schemas ---
 class ContratBase(BaseModel):
     locataire_id: int
@@ -444,8 +469,28 @@ class MediaResponse(MediaBase):
     id: int
     url: str
     type: str  # photo | video
+    taille: Optional[int] = None
+    largeur: Optional[int] = None
+    hauteur: Optional[int] = None
+    apercu: Optional[str] = None
+    derives: Optional[Dict[str, Dict[str, Any]]] = None  # vignette | carte | plein
+    derives_statut: Optional[str] = None
     cree_le: datetime
-    
+
+    class Config:
+        from_attributes = True
+
+# --- Upload reprenable (gros fichiers vidéo) ---
+class UploadSessionCreate(MediaBase):
+    taille: int = Field(..., gt=0)  # taille totale du fichier, en octets
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    chambre_id: int
+    taille: int
+    octets_recus: int  # offset du prochain morceau à envoyer
+    expire_le: datetime
+
     class Config:
         from_attributes = True
 
@@ -476,6 +521,14 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None  # Email ou ID selon le contenu du token
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class RefreshTokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str  # Nouveau jeton : l'ancien est révoqué (rotation)
+    token_type: str = "bearer"
+
 # --- SCHÉMA PRINCIPAL POUR LES RÉSULTATS DE RECHERCHE ---
 class RechercheResult(BaseModel):
     """
@@ -502,4 +555,140 @@ class PaiementDetailResponse(PaiementBase):
     locataire: SimpleUserResponse
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- Entités du format normalisé des listes de paiements (?format=normalise) ---
+# Construites directement depuis les tuples SQL (model_construct), sans revalidation :
+# voir app/services/projections.py
+class MaisonListItem(BaseModel):
+    id: int
+    nom: str
+    adresse: str
+    ville: str
+    proprietaire_id: Optional[int] = None
+
+class ChambreListItem(BaseModel):
+    id: int
+    maison_id: Optional[int] = None
+    titre: str
+    type: str
+    prix: float
+    disponible: Optional[bool] = None
+    maison: Optional[MaisonListItem] = None
+
+class ContratListItem(BaseModel):
+    id: int
+    locataire_id: Optional[int] = None
+    chambre_id: Optional[int] = None
+    date_debut: date
+    date_fin: date
+    periodicite: str
+    statut: str
+
+# --- Pages des listes paginées par curseur ---
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None  # None : dernière page
+
+# --- Format normalisé des listes de paiements (?format=normalise) ---
+# Chaque paiement référence ses entités par identifiant ; les entités sont
+# renvoyées une seule fois dans `included`, indexées par id.
+
+class PaiementNormalizedItem(BaseModel):
+    id: int
+    contrat_id: Optional[int] = None
+    montant: float
+    statut: str
+    date_echeance: date
+    date_paiement: Optional[datetime] = None
+    cree_le: Optional[datetime] = None
+    chambre_id: Optional[int] = None
+    maison_id: Optional[int] = None
+    locataire_id: Optional[int] = None
+
+class PaiementIncluded(BaseModel):
+    contrats: Dict[int, ContratListItem] = {}
+    chambres: Dict[int, ChambreListItem] = {}  # `maison` non imbriquée : voir maison_id
+    maisons: Dict[int, MaisonListItem] = {}
+    locataires: Dict[int, SimpleUserResponse] = {}
+
+class PaiementNormalizedResponse(BaseModel):
+    data: List[PaiementNormalizedItem]
+    included: PaiementIncluded
+    next_cursor: Optional[str] = None
+
+# --- Tableau de bord des paiements du propriétaire (agrégats SQL) ---
+
+class PaiementTotaux(BaseModel):
+    du: float = 0
+    encaisse: float = 0
+    reste: float = 0
+    nombre: int = 0
+
+class PaiementResumeMois(PaiementTotaux):
+    mois: str  # AAAA-MM (mois d'échéance)
+
+class PaiementResumeMaison(PaiementTotaux):
+    maison_id: int
+    nom: Optional[str] = None
+
+class PaiementResumeChambre(PaiementTotaux):
+    chambre_id: int
+    maison_id: Optional[int] = None
+    titre: Optional[str] = None
+
+class PaiementRetards(BaseModel):
+    nombre: int = 0
+    montant: float = 0
+
+class LocataireEnRetard(PaiementRetards):
+    locataire_id: int
+    nom: Optional[str] = None
+
+class PaiementResumeResponse(BaseModel):
+    totaux: PaiementTotaux
+    retards: PaiementRetards
+    par_mois: List[PaiementResumeMois]
+    par_maison: List[PaiementResumeMaison]
+    par_chambre: List[PaiementResumeChambre]
+    locataires_en_retard: List[LocataireEnRetard]
+
+# --- Import CSV en masse ---
+
+class ImportErreurLigne(BaseModel):
+    ligne: int  # Numéro de ligne dans le fichier CSV (l'en-tête est la ligne 1)
+    erreurs: List[str]
+
+class ImportResultat(BaseModel):
+    total: int
+    inseres: int
+    erreurs: List[ImportErreurLigne] = []
+    erreurs_tronquees: bool = False  # Plus d'erreurs que IMPORT_MAX_ERRORS : liste coupée
+
+# --- Mises à jour en masse (propriétaire) ---
+
+class ChambreBulkChanges(BaseModel):
+    prix: Optional[float] = Field(default=None, gt=0)
+    prix_variation_pct: Optional[float] = Field(default=None, gt=-100)  # ex: 5 = +5 %, appliqué au prix actuel
+    disponible: Optional[bool] = None
+    meublee: Optional[bool] = None
+    salle_de_bain: Optional[bool] = None
+    capacite: Optional[int] = Field(default=None, gt=0)
+
+class ChambreBulkUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+    changes: ChambreBulkChanges
+
+class RendezVousBulkUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+    statut: str  # confirmé | annulé
+
+class BulkIgnore(BaseModel):
+    id: int
+    raison: str
+
+class BulkUpdateResult(BaseModel):
+    modifies: List[int]
+    ignores: List[BulkIgnore] = []
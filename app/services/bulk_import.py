@@ -0,0 +1,173 @@
+# app/services/bulk_import.py
+"""
+Import CSV en masse : lecture du fichier par morceaux, validation pydantic par lot,
+insertion par executemany dans une transaction par morceau, erreurs rapportées par ligne.
+
+La taille du fichier (IMPORT_MAX_BYTES) et le nombre de lignes (IMPORT_MAX_ROWS) sont
+contrôlés avant la première insertion : un fichier hors limites est refusé en 413
+sans qu'aucune ligne ne soit importée.
+"""
+import codecs
+import csv
+import os
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+# Lignes validées et insérées par transaction
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "500"))
+# Nombre maximal d'erreurs renvoyées dans le rapport
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+# Limites d'un fichier importé
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(10 * 1024 * 1024)))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "50000"))
+
+# Une étape de contrôle reçoit les lignes validées du morceau et retourne {index: message} à rejeter
+ChunkCheck = Callable[[Session, List[dict]], Dict[int, str]]
+
+
+class ImportReport:
+    def __init__(self):
+        self.total = 0
+        self.inseres = 0
+        self.erreurs: List[dict] = []
+        self.erreurs_tronquees = False
+
+    def add_error(self, ligne: int, messages: List[str]):
+        if len(self.erreurs) >= IMPORT_MAX_ERRORS:
+            self.erreurs_tronquees = True
+            return
+        self.erreurs.append({"ligne": ligne, "erreurs": messages})
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "inseres": self.inseres,
+            "erreurs": self.erreurs,
+            "erreurs_tronquees": self.erreurs_tronquees,
+        }
+
+
+def _csv_rows(binary_file) -> Iterator[Tuple[int, dict]]:
+    text = codecs.getreader("utf-8-sig")(binary_file)  # Tolère le BOM ajouté par Excel
+    reader = csv.DictReader(text)
+    return ((reader.line_num, row) for row in reader)
+
+
+def _check_limits(binary_file):
+    """
+    Lève 413 si le fichier dépasse IMPORT_MAX_BYTES octets ou IMPORT_MAX_ROWS lignes ;
+    le comptage s'arrête dès la limite franchie et le fichier est rembobiné.
+    """
+    size = binary_file.seek(0, os.SEEK_END)
+    binary_file.seek(0)
+    if size > IMPORT_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Fichier trop volumineux (maximum {IMPORT_MAX_BYTES // (1024 * 1024)} Mo)."
+        )
+    rows = sum(1 for _ in islice(_csv_rows(binary_file), IMPORT_MAX_ROWS + 1))
+    binary_file.seek(0)
+    if rows > IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Trop de lignes dans le fichier (maximum {IMPORT_MAX_ROWS})."
+        )
+
+
+def _read_csv_chunks(binary_file) -> Iterator[List[Tuple[int, dict]]]:
+    """Lit le CSV au fil de l'eau ; produit des morceaux de (numéro de ligne, ligne)."""
+    rows = _csv_rows(binary_file)
+    while True:
+        chunk = list(islice(rows, IMPORT_CHUNK_ROWS))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _clean(row: dict, overrides: dict) -> dict:
+    # Cellule vide = valeur absente (champs optionnels / valeurs par défaut du schéma)
+    data = {key.strip(): value.strip() for key, value in row.items() if key and value is not None and value.strip() != ""}
+    data.update(overrides)
+    return data
+
+
+def _validate_chunk(adapter: TypeAdapter, schema: Type[BaseModel], items: List[dict]) -> Tuple[List[Optional[BaseModel]], Dict[int, List[str]]]:
+    """
+    Valide le morceau en un seul appel ; en cas d'échec, seules les lignes
+    fautives sont identifiées (loc[0] = index) et les autres revalidées une à une.
+    """
+    try:
+        return adapter.validate_python(items), {}
+    except ValidationError as exc:
+        errors: Dict[int, List[str]] = {}
+        for error in exc.errors():
+            index = error["loc"][0]
+            field = ".".join(str(part) for part in error["loc"][1:]) or "ligne"
+            errors.setdefault(index, []).append(f"{field}: {error['msg']}")
+        validated = [None if index in errors else schema.model_validate(item) for index, item in enumerate(items)]
+        return validated, errors
+
+
+def _insert_rows(db: Session, model, rows: List[Tuple[int, dict]], report: ImportReport):
+    """
+    Insère un morceau avec un executemany et un seul commit. Si la base refuse le lot
+    (contrainte), on le rejoue ligne par ligne pour n'écarter que les lignes fautives.
+    """
+    if not rows:
+        return
+    try:
+        db.execute(insert(model), [values for _, values in rows])
+        db.commit()
+        report.inseres += len(rows)
+        return
+    except IntegrityError:
+        db.rollback()
+    for line, values in rows:
+        try:
+            db.execute(insert(model), [values])
+            db.commit()
+            report.inseres += 1
+        except IntegrityError as exc:
+            db.rollback()
+            report.add_error(line, [f"base de données: {exc.orig}"])
+
+
+def import_csv(
+    db: Session,
+    binary_file,
+    schema: Type[BaseModel],
+    model,
+    overrides: Optional[dict] = None,
+    checks: Iterable[ChunkCheck] = (),
+) -> dict:
+    """
+    Importe un fichier CSV dont les en-têtes correspondent aux champs de `schema`.
+    `overrides` force des valeurs (ex: proprietaire_id) ; `checks` sont des contrôles
+    ensemblistes (ex: propriété des maisons) exécutés une fois par morceau.
+    """
+    _check_limits(binary_file)
+    adapter = TypeAdapter(List[schema])
+    report = ImportReport()
+    for chunk in _read_csv_chunks(binary_file):
+        report.total += len(chunk)
+        lines = [line for line, _ in chunk]
+        items = [_clean(row, overrides or {}) for _, row in chunk]
+
+        validated, errors = _validate_chunk(adapter, schema, items)
+        valid = [(index, obj.model_dump()) for index, obj in enumerate(validated) if obj is not None]
+        for check in checks:
+            rejected = check(db, [values for _, values in valid])
+            for position in sorted(rejected):
+                errors.setdefault(valid[position][0], []).append(rejected[position])
+            valid = [entry for position, entry in enumerate(valid) if position not in rejected]
+
+        for index in sorted(errors):
+            report.add_error(lines[index], errors[index])
+        _insert_rows(db, model, [(lines[index], values) for index, values in valid], report)
+    return report.as_dict()
@@ -0,0 +1,81 @@
+# app/services/email_templates.py
+"""
+Rendu des emails à partir des modèles de app/templates/emails.
+
+Les modèles (string.Template) sont lus et compilés une seule fois, à l'import ;
+le rendu est fait par le worker de l'outbox, à partir du contexte JSON (données
+simples, sans objets ORM) enregistré par les endpoints.
+
+Pour un modèle <nom> : <nom>.html et/ou <nom>.txt (le texte est dérivé du HTML
+s'il manque). Si le contexte contient une liste "lignes", chaque élément est rendu
+avec <nom>.ligne.html / <nom>.ligne.txt. Les valeurs sont échappées dans le HTML.
+"""
+import html
+import re
+from datetime import datetime
+from pathlib import Path
+from string import Template
+from typing import Any, Dict, Optional, Tuple
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates" / "emails"
+
+SUBJECTS = {
+    "locataire_rdv_en_attente": "Demande de rendez-vous pour: ${chambre_titre}",
+    "locataire_rdv_confirme": "Rendez-vous confirmé: ${chambre_titre} - ${date}",
+    "locataire_rdv_annule": "Rendez-vous annulé: ${chambre_titre}",
+    "locataire_rdv_mise_a_jour": "Mise à jour de votre rendez-vous pour: ${chambre_titre}",
+    "proprietaire_creation": "Nouvelle demande de rendez-vous: ${chambre_titre}",
+    "proprietaire_modification_date": "Modification de rendez-vous: ${chambre_titre}",
+    "proprietaire_annulation_locataire": "Annulation de rendez-vous: ${chambre_titre}",
+    "proprietaire_annulation_proprietaire": "Rendez-vous annulé: ${chambre_titre}",
+    "proprietaire_resume": "Vos rendez-vous : ${nombre} mise(s) à jour",
+    "paiement_recu": "Nouveau paiement reçu",
+}
+
+# Compilés une fois pour toutes
+_SUBJECT_TEMPLATES = {name: Template(subject) for name, subject in SUBJECTS.items()}
+_TEMPLATES = {path.name: Template(path.read_text(encoding="utf-8")) for path in TEMPLATES_DIR.glob("*.*")}
+
+_TAGS = re.compile(r"<[^>]+>")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+def _html_to_text(content: str) -> str:
+    text = html.unescape(_TAGS.sub("", content.replace("<br>", "\n")))
+    lines = [line.strip() for line in text.splitlines()]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _prepare(context: Dict[str, Any]) -> Dict[str, str]:
+    """Valeurs en chaînes ; date_heure (ISO) donne aussi "date" au format d'affichage."""
+    values = {key: "" if value is None else str(value) for key, value in context.items() if key != "lignes"}
+    date_heure = context.get("date_heure")
+    values.setdefault("date", datetime.fromisoformat(date_heure).strftime('%d/%m/%Y à %H:%M') if date_heure else "non précisée")
+    return values
+
+
+def _render_file(filename: str, values: Dict[str, str], escape: bool, extra: Dict[str, str]) -> Optional[str]:
+    template = _TEMPLATES.get(filename)
+    if template is None:
+        return None
+    if escape:
+        values = {key: html.escape(value) for key, value in values.items()}
+    return template.substitute(values, **extra)
+
+
+def _render_lines(name: str, ext: str, lines, escape: bool) -> str:
+    rendered = (_render_file(f"{name}.ligne.{ext}", _prepare(line), escape, {}) for line in lines)
+    return "\n".join(line.rstrip("\n") for line in rendered if line is not None)
+
+
+def render_email(name: str, context: Dict[str, Any]) -> Tuple[str, str, Optional[str]]:
+    """Retourne (sujet, texte, html) ; lève KeyError si le modèle ou une variable manque."""
+    if name not in _SUBJECT_TEMPLATES:
+        raise KeyError(f"Modèle d'email inconnu: {name}")
+    values = _prepare(context)
+    lines = context.get("lignes", [])
+    html_body = _render_file(f"{name}.html", values, True, {"lignes": _render_lines(name, "html", lines, True)})
+    text_body = _render_file(f"{name}.txt", values, False, {"lignes": _render_lines(name, "txt", lines, False)})
+    if text_body is None:
+        text_body = _html_to_text(html_body or "")
+    return _SUBJECT_TEMPLATES[name].substitute(values), text_body, html_body
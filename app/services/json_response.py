@@ -0,0 +1,66 @@
+# app/services/json_response.py
+"""
+Classe de réponse JSON rapide, utilisée par défaut par toute l'application.
+
+orjson (dépendance optionnelle) sérialise directement datetime, date, UUID et
+enum ; à défaut on se rabat sur le module json standard. Les endpoints qui
+renvoient directement une FastJSONResponse (ou list_response, voir
+projections.py) évitent aussi le parcours de jsonable_encoder par FastAPI.
+"""
+import json
+import time
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.services.metrics import observe_serialization
+
+try:
+    import orjson
+except ImportError:  # orjson absent : repli sur le module json standard
+    orjson = None
+
+JSON_ENCODER = "orjson" if orjson is not None else "json"
+
+
+def _default(obj: Any):
+    """Types non gérés nativement par l'encodeur (Decimal, modèles pydantic, ...)."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, dt_time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8")
+    raise TypeError(f"Type non sérialisable en JSON: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode `content` en JSON (bytes UTF-8) avec l'encodeur le plus rapide disponible."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encodée par orjson (ou json), avec mesure du temps d'encodage."""
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = dumps(content)
+        observe_serialization(JSON_ENCODER, time.perf_counter() - start)
+        return body
@@ -0,0 +1,175 @@
+# app/services/media_derivatives.py
+"""
+Déclinaisons des photos uploadées (vignette, carte, plein écran).
+
+Après l'enregistrement d'un média, chaque taille de DERIVATIVE_SIZES est générée
+en WebP et en JPEG, sans métadonnées EXIF (l'orientation est appliquée aux pixels),
+ainsi qu'un aperçu flou minuscule (data URI) à afficher pendant le chargement.
+Le traitement, limité par le CPU, tourne dans un pool de processus dédié ; le
+résultat est enregistré sur la ligne Media (colonnes derives, largeur, hauteur,
+apercu, derives_statut).
+
+Pillow est optionnel : sans lui, les photos sont servies telles quelles.
+Les médias restés en attente (arrêt du serveur...) sont traités par
+scripts/generate_media_derivatives.py.
+"""
+import base64
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from PIL import Image, ImageFilter, ImageOps
+except ImportError:  # Pillow non installé : pas de déclinaisons
+    Image = None
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+
+MEDIA_DERIVATIVE_WORKERS = int(os.getenv("MEDIA_DERIVATIVE_WORKERS", "2"))
+# Plus grand côté, en pixels ; une image plus petite n'est pas agrandie
+DERIVATIVE_SIZES = {"vignette": 320, "carte": 800, "plein": 1920}
+JPEG_QUALITY = int(os.getenv("MEDIA_JPEG_QUALITY", "82"))
+WEBP_QUALITY = int(os.getenv("MEDIA_WEBP_QUALITY", "80"))
+PLACEHOLDER_SIZE = 16
+
+IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+
+# --- Fonction exécutée dans les processus de travail (doit rester au niveau du module) ---
+
+def generate_derivatives(source: str) -> Dict[str, Any]:
+    """Génère les déclinaisons de `source` à côté de l'original ; retourne leur description."""
+    source_path = Path(source)
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGB")
+    width, height = image.size
+
+    derives = {}
+    for name, max_edge in DERIVATIVE_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        stem = source_path.with_name(f"{source_path.stem}_{name}")
+        # Aucun paramètre exif= : les fichiers produits n'ont pas de métadonnées
+        resized.save(f"{stem}.webp", "WEBP", quality=WEBP_QUALITY, method=4)
+        resized.save(f"{stem}.jpg", "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        derives[name] = {
+            "webp": f"{stem}.webp",
+            "jpeg": f"{stem}.jpg",
+            "largeur": resized.width,
+            "hauteur": resized.height,
+        }
+
+    placeholder = image.copy()
+    placeholder.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    placeholder = placeholder.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    placeholder.save(buffer, "WEBP", quality=30)
+    apercu = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    return {"source": source, "derives": derives, "largeur": width, "hauteur": height, "apercu": apercu}
+
+
+def get_derivative_pool() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # "spawn" : on ne duplique pas un processus multi-threadé (boucle, threadpool, SQLAlchemy)
+            _executor = ProcessPoolExecutor(
+                max_workers=MEDIA_DERIVATIVE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def record_result(media_id: int, result: Optional[Dict[str, Any]], error: Optional[BaseException] = None):
+    db = SessionLocal()
+    try:
+        media = db.query(models.Media).filter(models.Media.id == media_id).first()
+        if media is None:
+            # Supprimé entre-temps : les déclinaisons n'ont plus de propriétaire si l'original
+            # a disparu (sinon elles restent partagées par les médias de même contenu)
+            if result is None or os.path.exists(result["source"]):
+                return
+            for sizes in result["derives"].values():
+                for path in (sizes["webp"], sizes["jpeg"]):
+                    if os.path.exists(path):
+                        os.remove(path)
+            return
+        if error is not None:
+            media.derives_statut = "echec"
+            print(f"Médias: échec des déclinaisons du média {media_id}: {error}")
+        else:
+            media.derives = result["derives"]
+            media.largeur = result["largeur"]
+            media.hauteur = result["hauteur"]
+            media.apercu = result["apercu"]
+            media.derives_statut = "pret"
+        db.commit()
+    finally:
+        db.close()
+
+
+def _on_done(media_ids: List[int]):
+    def callback(future: Future):
+        if future.cancelled():
+            return  # Arrêt du serveur : les médias restent en attente
+        error = future.exception()
+        for media_id in media_ids:
+            record_result(media_id, None if error else future.result(), error)
+    return callback
+
+
+def needs_derivatives(media: models.Media) -> bool:
+    return Image is not None and media.type in IMAGE_TYPES
+
+
+def copy_shared_derivatives(db: Session, media: models.Media) -> bool:
+    """
+    Reprend les déclinaisons déjà générées pour le même fichier (stockage par empreinte :
+    les fichiers produits sont partagés). Retourne False s'il faut les générer.
+    """
+    if media.blob_id is None or not needs_derivatives(media):
+        return False
+    source = db.query(models.Media).filter(
+        models.Media.blob_id == media.blob_id, models.Media.derives_statut == "pret"
+    ).first()
+    if source is None:
+        return False
+    media.derives, media.largeur, media.hauteur, media.apercu = source.derives, source.largeur, source.hauteur, source.apercu
+    media.derives_statut = "pret"
+    return True
+
+
+def queue_derivatives(medias: Iterable[models.Media]):
+    """
+    Soumet au pool les photos à décliner (après le commit de leur création).
+    Les médias d'un même fichier (contenu identique) ne donnent lieu qu'à un traitement.
+    Le résultat est enregistré en base à la fin de chaque traitement.
+    """
+    by_source: Dict[str, List[int]] = {}
+    for media in medias:
+        if needs_derivatives(media):
+            by_source.setdefault(media.url, []).append(media.id)
+    for source, media_ids in by_source.items():
+        future = get_derivative_pool().submit(generate_derivatives, source)
+        future.add_done_callback(_on_done(media_ids))
+
+
+def shutdown_derivative_pool():
+    """Arrête les processus de traitement d'images (à l'arrêt de l'application)."""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,162 @@
+# app/services/media_serving.py
+"""
+Réponse HTTP des fichiers de uploaded_media.
+
+Les fichiers ne changent jamais de contenu (nom = empreinte SHA-256 ou uuid) :
+ils sont servis avec Cache-Control immutable et un ETag fort, les requêtes
+conditionnelles reçoivent 304 et les requêtes Range (lecture de vidéo, reprise
+de téléchargement) une réponse 206 partielle.
+
+Le corps est transmis sans copie (extension ASGI "http.response.zerocopysend",
+sendfile) quand le serveur la propose, sinon lu par morceaux en E/S asynchrones.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+MEDIA_CACHE_CONTROL = os.getenv("MEDIA_CACHE_CONTROL", "public, max-age=31536000, immutable")
+MEDIA_READ_CHUNK_BYTES = 256 * 1024
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_SHA256_NAME = re.compile(r"^[0-9a-f]{64}")
+
+
+def file_etag(path: Path, stat: os.stat_result) -> str:
+    """
+    ETag fort : l'empreinte du contenu pour les fichiers stockés par empreinte
+    (et leurs déclinaisons), sinon dérivé de la taille et de la date de modification.
+    """
+    match = _SHA256_NAME.match(path.name)
+    if match:
+        return f'"{path.stem}"'
+    return '"' + hashlib.md5(f"{stat.st_size}-{stat.st_mtime_ns}".encode()).hexdigest() + '"'
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Retourne (début, fin incluse) pour une plage unique ; None pour servir le fichier
+    entier (pas d'en-tête, syntaxe non reconnue ou plages multiples) ; lève ValueError
+    si la plage ne peut pas être satisfaite (416).
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # bytes=-N : les N derniers octets
+        length = int(last)
+        if length == 0:
+            raise ValueError("plage vide")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("plage hors du fichier")
+    return start, end
+
+
+def _not_modified(request_headers: Headers, etag: str, mtime: float) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class MediaFileResponse(Response):
+    """Réponse d'un fichier existant (chemin déjà validé par l'appelant)."""
+
+    def __init__(self, path: Path, stat: os.stat_result):
+        self.path = path
+        self.stat = stat
+        self.status_code = 200
+        self.background = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        request_headers = Headers(scope=scope)
+        size = self.stat.st_size
+        etag = file_etag(self.path, self.stat)
+        headers = {
+            "cache-control": MEDIA_CACHE_CONTROL,
+            "etag": etag,
+            "last-modified": formatdate(self.stat.st_mtime, usegmt=True),
+            "accept-ranges": "bytes",
+        }
+
+        if _not_modified(request_headers, etag, self.stat.st_mtime):
+            await self._send_head(send, 304, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        # If-Range : la plage n'est servie que si le client a encore la même version
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if if_range and if_range.strip() != etag:
+            range_header = None
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            headers["content-range"] = f"bytes */{size}"
+            headers["content-length"] = "0"
+            await self._send_head(send, 416, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if byte_range is None:
+            status_code, start, length = 200, 0, size
+        else:
+            start, end = byte_range
+            status_code, length = 206, end - start + 1
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+        headers["content-type"] = mimetypes.guess_type(self.path.name)[0] or "application/octet-stream"
+        headers["content-length"] = str(length)
+        await self._send_head(send, status_code, headers)
+
+        if scope["method"] == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(), "offset": start, "count": length,
+                })
+        else:
+            await self._send_chunks(send, start, length)
+
+    async def _send_head(self, send: Send, status_code: int, headers: dict):
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()],
+        })
+
+    async def _send_chunks(self, send: Send, start: int, length: int):
+        async with await anyio.open_file(self.path, "rb") as file:
+            await file.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = await file.read(min(MEDIA_READ_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:  # Fichier tronqué pendant l'envoi : clore la réponse
+            await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,195 @@
+# app/services/media_storage.py
+"""
+Écriture des fichiers uploadés dans uploaded_media.
+
+Le fichier est copié par morceaux de MEDIA_UPLOAD_CHUNK_BYTES avec des E/S
+asynchrones : la mémoire utilisée par un upload reste constante quelle que soit
+sa taille. Le type réel est déterminé à partir des premiers octets (et non du
+Content-Type déclaré par le client), l'empreinte SHA-256 est calculée au fil de
+l'écriture et la taille maximale est vérifiée à chaque morceau. En cas d'échec,
+le fichier partiel est supprimé.
+
+Stockage par empreinte : chaque contenu distinct est écrit une seule fois, sous
+uploaded_media/<sha256>-<suffixe>.<extension> (table media_blobs), et partagé par
+tous les médias identiques. Le fichier n'est supprimé qu'avec sa dernière référence ;
+le suffixe aléatoire garantit qu'un contenu réenregistré pendant cette suppression
+n'écrit jamais sur un fichier en cours d'effacement.
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+import anyio
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", "uploaded_media"))
+MEDIA_UPLOAD_CHUNK_BYTES = int(os.getenv("MEDIA_UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+MEDIA_MAX_UPLOAD_BYTES = int(os.getenv("MEDIA_MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+
+# Octets de début de fichier suffisants pour reconnaître les formats acceptés
+SNIFF_BYTES = 32
+
+Blob = models.MediaBlob
+
+
+class StoredUpload:
+    def __init__(self, path: Path, size: int, sha256: str, content_type: str):
+        self.path: Optional[Path] = path  # None une fois l'upload remplacé par un fichier existant
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+
+
+def sniff_content_type(head: bytes) -> Optional[Tuple[str, str]]:
+    """Retourne (type MIME, extension) d'après les premiers octets, ou None si le format n'est pas accepté."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg", "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png", "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif", "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", "webp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"heic", b"heix", b"mif1", b"msf1"):
+            return "image/heic", "heic"
+        if brand == b"qt  ":
+            return "video/quicktime", "mov"
+        return "video/mp4", "mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm", "webm"
+    return None
+
+
+def _remove(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+async def save_upload(file: UploadFile, max_bytes: int = MEDIA_MAX_UPLOAD_BYTES) -> StoredUpload:
+    """
+    Copie l'upload dans MEDIA_ROOT sous un nom unique ; lève 415 si le format n'est
+    pas reconnu, 413 si la taille dépasse max_bytes.
+    """
+    head = await file.read(SNIFF_BYTES)
+    sniffed = sniff_content_type(head)
+    if sniffed is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Format de fichier non pris en charge (images JPEG, PNG, GIF, WebP, HEIC ou vidéos MP4, MOV, WebM)."
+        )
+    content_type, extension = sniffed
+
+    MEDIA_ROOT.mkdir(exist_ok=True)
+    name = uuid4().hex
+    partial_path = MEDIA_ROOT / f"{name}.part"
+    final_path = MEDIA_ROOT / f"{name}.{extension}"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with await anyio.open_file(partial_path, "wb") as output:
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Fichier trop volumineux (maximum {max_bytes // (1024 * 1024)} Mo)."
+                    )
+                digest.update(chunk)
+                await output.write(chunk)
+                chunk = await file.read(MEDIA_UPLOAD_CHUNK_BYTES)
+        os.replace(partial_path, final_path)
+    except BaseException:
+        # Échec, dépassement de taille ou client déconnecté : pas de fichier partiel
+        _remove(partial_path)
+        raise
+    return StoredUpload(final_path, size, digest.hexdigest(), content_type)
+
+
+def discard_upload(stored: StoredUpload):
+    """Supprime un fichier déjà écrit dont l'enregistrement en base a échoué."""
+    if stored.path is not None:
+        _remove(stored.path)
+
+
+def acquire_blob(db: Session, stored: StoredUpload) -> models.MediaBlob:
+    """
+    Rattache l'upload au fichier stocké sous son empreinte et y ajoute une référence.
+    Contenu déjà connu : l'upload est supprimé. Sinon il est renommé en
+    <sha256>-<suffixe>.<extension> (si le commit échoue ensuite, discard_upload(stored) le supprime).
+    Ne valide pas la transaction.
+    """
+    for _ in range(3):
+        blob = db.query(Blob).filter(Blob.sha256 == stored.sha256).first()
+        if blob is None:
+            # Nom toujours unique : si un blob de même empreinte vient d'être supprimé par
+            # une requête concurrente, ses fichiers (et déclinaisons) peuvent être effacés
+            # après son commit ; ils ne portent jamais le nom du nouveau fichier
+            path = MEDIA_ROOT / f"{stored.sha256}-{uuid4().hex[:8]}{stored.path.suffix}"
+            blob = Blob(
+                sha256=stored.sha256, chemin=str(path), taille=stored.size,
+                type=stored.content_type, nb_references=0,
+            )
+            try:
+                with db.begin_nested():
+                    db.add(blob)
+            except IntegrityError:
+                continue  # Même contenu enregistré au même moment par une autre requête
+            os.replace(stored.path, path)
+            stored.path = path
+        updated = db.query(Blob).filter(Blob.id == blob.id).update(
+            {Blob.nb_references: Blob.nb_references + 1}, synchronize_session=False
+        )
+        if updated:
+            break
+        # La dernière référence a été retirée entre la lecture et la mise à jour
+        db.expunge(blob)
+    else:
+        raise RuntimeError(f"Impossible de référencer le fichier {stored.sha256}")
+
+    if stored.path is not None and stored.path != Path(blob.chemin):
+        if os.path.exists(blob.chemin):
+            _remove(stored.path)
+        else:  # Fichier perdu sur disque : l'upload le remplace
+            os.replace(stored.path, blob.chemin)
+        stored.path = None
+    return blob
+
+
+def _files_of(path: str) -> List[Path]:
+    """Le fichier et ses déclinaisons (<nom>_<taille>.<ext>, voir media_derivatives.py)."""
+    path = Path(path)
+    return [path, *path.parent.glob(f"{path.stem}_*")]
+
+
+def release_media_files(db: Session, media: models.Media) -> List[Path]:
+    """
+    Retire la référence du média à son fichier. Retourne les fichiers à supprimer
+    après le commit : ceux du blob s'il n'est plus référencé, rien sinon.
+    Les médias antérieurs au stockage par empreinte possèdent leur fichier.
+    """
+    if media.blob_id is None:
+        return _files_of(media.url)
+    db.query(Blob).filter(Blob.id == media.blob_id).update(
+        {Blob.nb_references: Blob.nb_references - 1}, synchronize_session=False
+    )
+    blob = db.query(Blob).filter(Blob.id == media.blob_id).populate_existing().first()
+    if blob is None or blob.nb_references > 0:
+        return []
+    db.delete(blob)
+    return _files_of(blob.chemin)
+
+
+def remove_files(paths: Iterable[Path]):
+    for path in paths:
+        _remove(Path(path))
@@ -0,0 +1,279 @@
+# app/services/media_uploads.py
+"""
+Upload reprenable des gros fichiers (visites vidéo sur connexion mobile).
+
+Le client ouvre une session en annonçant la taille totale, envoie le fichier par
+morceaux (PATCH avec l'en-tête Upload-Offset) et, après une coupure, demande
+l'offset atteint pour reprendre au bon octet au lieu de tout renvoyer. Chaque
+morceau est écrit directement dans un fichier temporaire, sans être gardé en
+mémoire ; les octets reçus avant une déconnexion sont conservés. Un seul envoi
+écrit à la fois dans une session : il la réserve en base (bail) avant d'écrire
+le moindre octet, un envoi concurrent reçoit 409. Une fois le fichier complet,
+la finalisation réserve la session de la même façon (une finalisation répétée
+reçoit 409, puis 404 une fois le média créé), le contrôle comme un upload
+classique (type réel, taille, empreinte) et le remet à media_storage.
+
+Une session sans activité pendant MEDIA_UPLOAD_SESSION_TTL secondes expire :
+elle est supprimée avec son fichier temporaire.
+"""
+import hashlib
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from uuid import uuid4
+
+import anyio
+from fastapi import HTTPException, status
+from sqlalchemy import inspect, or_
+from sqlalchemy.orm import Session
+from starlette.requests import ClientDisconnect
+
+from app import models
+from app.services.media_storage import (
+    MEDIA_MAX_UPLOAD_BYTES, MEDIA_ROOT, MEDIA_UPLOAD_CHUNK_BYTES, SNIFF_BYTES, StoredUpload, sniff_content_type,
+)
+
+MEDIA_UPLOAD_SESSION_TTL = int(os.getenv("MEDIA_UPLOAD_SESSION_TTL", str(24 * 3600)))
+# Durée du bail d'écriture d'un morceau, renouvelé tant que des octets arrivent
+MEDIA_UPLOAD_WRITE_LEASE = int(os.getenv("MEDIA_UPLOAD_WRITE_LEASE", "120"))
+# Hors de MEDIA_ROOT : les fichiers incomplets ne sont jamais servis
+UPLOAD_SESSIONS_DIR = Path(os.getenv("MEDIA_UPLOAD_SESSIONS_DIR", "upload_sessions"))
+
+UploadSession = models.UploadSession
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _expiry(now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.utcnow()) + timedelta(seconds=MEDIA_UPLOAD_SESSION_TTL)
+
+
+def purge_expired_sessions(db: Session, now: Optional[datetime] = None) -> int:
+    """Supprime les sessions expirées et leurs fichiers temporaires ; retourne leur nombre."""
+    expired = db.query(UploadSession).filter(UploadSession.expire_le <= (now or datetime.utcnow())).all()
+    for session in expired:
+        db.delete(session)
+    db.commit()
+    for session in expired:
+        _remove(session.chemin)
+    return len(expired)
+
+
+def create_session(db: Session, chambre_id: int, utilisateur_id: int, taille: int,
+                   description: Optional[str] = None) -> models.UploadSession:
+    if taille > MEDIA_MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Fichier trop volumineux (maximum {MEDIA_MAX_UPLOAD_BYTES // (1024 * 1024)} Mo)."
+        )
+    # Nettoyage au fil de l'eau des sessions abandonnées
+    purge_expired_sessions(db)
+
+    UPLOAD_SESSIONS_DIR.mkdir(exist_ok=True)
+    session_id = uuid4().hex
+    path = UPLOAD_SESSIONS_DIR / f"{session_id}.part"
+    path.touch()
+    session = UploadSession(
+        id=session_id, chambre_id=chambre_id, utilisateur_id=utilisateur_id, taille=taille,
+        octets_recus=0, chemin=str(path), description=description, expire_le=_expiry(),
+    )
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session
+
+
+def get_session(db: Session, session_id: str, utilisateur_id: int) -> models.UploadSession:
+    """Session en cours de l'utilisateur ; 404 si elle n'existe pas, plus ou appartient à un autre."""
+    session = db.query(UploadSession).filter(UploadSession.id == session_id).first()
+    if session is not None and session.expire_le <= datetime.utcnow():
+        delete_session(db, session)
+        session = None
+    if session is None or session.utilisateur_id != utilisateur_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session d'upload non trouvée ou expirée")
+    return session
+
+
+def delete_session(db: Session, session: models.UploadSession):
+    db.delete(session)
+    db.commit()
+    _remove(session.chemin)
+
+
+def _offset_conflict(expected: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Offset incorrect : le prochain morceau doit commencer à l'octet {expected}.",
+        headers={"Upload-Offset": str(expected)},
+    )
+
+
+def _write_conflict(session: models.UploadSession) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Un autre envoi ou une finalisation est en cours pour cette session.",
+        headers={"Upload-Offset": str(session.octets_recus)},
+    )
+
+
+def _claim(db: Session, session: models.UploadSession, offset: int) -> str:
+    """
+    Réserve l'écriture de la session (bail de MEDIA_UPLOAD_WRITE_LEASE secondes) avant
+    tout octet écrit ; lève 409 si l'offset n'est pas le bon ou si un autre envoi est en cours
+    (typiquement un client qui renvoie le morceau pendant que le premier envoi continue).
+    """
+    now = datetime.utcnow()
+    token = uuid4().hex
+    claimed = db.query(UploadSession).filter(
+        UploadSession.id == session.id,
+        UploadSession.octets_recus == offset,
+        or_(UploadSession.ecriture_jusqu_au.is_(None), UploadSession.ecriture_jusqu_au < now),
+    ).update({UploadSession.ecriture_jeton: token,
+              UploadSession.ecriture_jusqu_au: now + timedelta(seconds=MEDIA_UPLOAD_WRITE_LEASE)},
+             synchronize_session=False)
+    db.commit()
+    db.refresh(session)
+    if not claimed:
+        if session.octets_recus != offset:
+            raise _offset_conflict(session.octets_recus)
+        raise _write_conflict(session)
+    return token
+
+
+def _release(db: Session, session: models.UploadSession, token: str):
+    db.query(UploadSession).filter(
+        UploadSession.id == session.id, UploadSession.ecriture_jeton == token
+    ).update({UploadSession.ecriture_jeton: None, UploadSession.ecriture_jusqu_au: None},
+             synchronize_session=False)
+    db.commit()
+
+
+def _renew(db: Session, session: models.UploadSession, token: str) -> bool:
+    """Prolonge le bail ; False s'il a expiré et a été repris par un autre envoi."""
+    renewed = db.query(UploadSession).filter(
+        UploadSession.id == session.id, UploadSession.ecriture_jeton == token
+    ).update({UploadSession.ecriture_jusqu_au: datetime.utcnow() + timedelta(seconds=MEDIA_UPLOAD_WRITE_LEASE)},
+             synchronize_session=False)
+    db.commit()
+    return bool(renewed)
+
+
+async def append_chunk(db: Session, session: models.UploadSession, offset: int,
+                       chunks: AsyncIterator[bytes]) -> int:
+    """
+    Écrit le morceau reçu à partir de `offset` (qui doit être l'offset atteint) ;
+    retourne le nouvel offset. Si le client se déconnecte en cours de route, les
+    octets déjà écrits sont conservés et comptés.
+    """
+    if offset != session.octets_recus:
+        raise _offset_conflict(session.octets_recus)
+    token = _claim(db, session, offset)
+
+    written = 0
+    too_large = lease_lost = False
+    renew_at = anyio.current_time() + MEDIA_UPLOAD_WRITE_LEASE / 2
+    try:
+        async with await anyio.open_file(session.chemin, "r+b") as output:
+            await output.seek(offset)
+            await output.truncate()  # Restes éventuels d'un envoi précédent interrompu
+            try:
+                async for chunk in chunks:
+                    if offset + written + len(chunk) > session.taille:
+                        too_large = True
+                        break
+                    if anyio.current_time() >= renew_at:
+                        if not _renew(db, session, token):
+                            lease_lost = True
+                            break
+                        renew_at = anyio.current_time() + MEDIA_UPLOAD_WRITE_LEASE / 2
+                    await output.write(chunk)
+                    written += len(chunk)
+            except ClientDisconnect:
+                pass  # Reprise possible à partir des octets reçus
+            if not lease_lost:
+                await output.truncate()
+    except BaseException:
+        # Octets non comptabilisés : le prochain envoi repartira de l'offset enregistré
+        _release(db, session, token)
+        raise
+
+    # Le bail est libéré avec l'enregistrement du nouvel offset, s'il est toujours détenu
+    new_offset = offset + written
+    updated = 0
+    if not lease_lost:
+        updated = db.query(UploadSession).filter(
+            UploadSession.id == session.id, UploadSession.ecriture_jeton == token
+        ).update({UploadSession.octets_recus: new_offset, UploadSession.expire_le: _expiry(),
+                  UploadSession.ecriture_jeton: None, UploadSession.ecriture_jusqu_au: None},
+                 synchronize_session=False)
+        db.commit()
+    db.refresh(session)
+    if not updated:
+        raise _write_conflict(session)
+    if too_large:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Le morceau dépasse la taille annoncée ({session.taille} octets).",
+            headers={"Upload-Offset": str(new_offset)},
+        )
+    return new_offset
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(MEDIA_UPLOAD_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def complete_session(db: Session, session: models.UploadSession) -> StoredUpload:
+    """
+    Contrôle le fichier complet et le déplace dans MEDIA_ROOT. La session est
+    supprimée de la transaction en cours (validée avec la création du média).
+    Un format non reconnu (415) abandonne la session. La session est réservée
+    comme pour un morceau : une finalisation concurrente reçoit 409.
+    """
+    if session.octets_recus != session.taille:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload incomplet : {session.octets_recus} octets reçus sur {session.taille}.",
+            headers={"Upload-Offset": str(session.octets_recus)},
+        )
+    token = _claim(db, session, session.taille)
+    try:
+        async with await anyio.open_file(session.chemin, "rb") as source:
+            head = await source.read(SNIFF_BYTES)
+        sniffed = sniff_content_type(head)
+        if sniffed is None:
+            delete_session(db, session)
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Format de fichier non pris en charge (images JPEG, PNG, GIF, WebP, HEIC ou vidéos MP4, MOV, WebM)."
+            )
+        content_type, extension = sniffed
+
+        sha256 = await anyio.to_thread.run_sync(_hash_file, session.chemin)
+        # Bail expiré pendant le calcul de l'empreinte et repris par une autre finalisation
+        if not _renew(db, session, token):
+            raise _write_conflict(session)
+        MEDIA_ROOT.mkdir(exist_ok=True)
+        final_path = MEDIA_ROOT / f"{uuid4().hex}.{extension}"
+        # shutil.move : les deux répertoires peuvent être sur des systèmes de fichiers différents
+        await anyio.to_thread.run_sync(shutil.move, session.chemin, final_path)
+    except FileNotFoundError:
+        # Session abandonnée (DELETE) pendant la finalisation
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session d'upload non trouvée ou expirée")
+    except BaseException:
+        if inspect(session).persistent:
+            _release(db, session, token)
+        raise
+    db.delete(session)
+    return StoredUpload(final_path, session.taille, sha256, content_type)
@@ -0,0 +1,255 @@
+# app/services/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy.pool import QueuePool
+
+from app.services.request_context import current_scope
+
+# Bornes (en secondes) des histogrammes de latence
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bornes plus fines pour l'attente d'une connexion dans le pool
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+# Bornes pour l'encodage JSON des réponses (de quelques µs à quelques centaines de ms)
+SERIALIZATION_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Par série : [compteurs par borne (non cumulés) + débordement, somme, nombre]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items()]
+        lines = self.header()
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+# --- Métriques de l'application ---
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Durée des requêtes HTTP par route", ("method", "route"),
+)
+REQUEST_STATUS = Counter(
+    "http_responses_total", "Nombre de réponses HTTP par route et code de statut", ("method", "route", "status"),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Nombre de requêtes HTTP en cours de traitement",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Temps d'attente pour obtenir une connexion du pool SQLAlchemy", buckets=POOL_WAIT_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out", "Connexions actuellement empruntées au pool",
+)
+RESPONSE_SERIALIZATION = Histogram(
+    "http_response_serialization_seconds", "Temps d'encodage JSON du corps des réponses par route",
+    ("method", "route", "encodeur"), buckets=SERIALIZATION_BUCKETS,
+)
+THREADPOOL_BORROWED = Gauge(
+    "threadpool_borrowed_tokens", "Threads du threadpool partagé actuellement occupés",
+)
+THREADPOOL_TOTAL = Gauge(
+    "threadpool_total_tokens", "Taille du threadpool partagé",
+)
+THREADPOOL_WAITING = Gauge(
+    "threadpool_tasks_waiting", "Tâches en attente d'un thread libre (saturation)",
+)
+
+REGISTRY = [
+    REQUEST_LATENCY,
+    REQUEST_STATUS,
+    REQUESTS_IN_FLIGHT,
+    RESPONSE_SERIALIZATION,
+    DB_POOL_WAIT,
+    DB_POOL_CHECKED_OUT,
+    THREADPOOL_BORROWED,
+    THREADPOOL_TOTAL,
+    THREADPOOL_WAITING,
+]
+
+
+def render_metrics() -> str:
+    """Rend toutes les métriques au format texte de Prometheus (version 0.0.4)."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def collect_runtime_stats(engine):
+    """
+    Relève l'occupation du pool de connexions et du threadpool d'anyio
+    utilisé pour les endpoints `def`. Doit être appelé depuis la boucle d'événements.
+    """
+    import anyio.to_thread
+
+    if hasattr(engine.pool, "checkedout"):
+        DB_POOL_CHECKED_OUT.set(engine.pool.checkedout())
+    stats = anyio.to_thread.current_default_thread_limiter().statistics()
+    THREADPOOL_BORROWED.set(stats.borrowed_tokens)
+    THREADPOOL_TOTAL.set(stats.total_tokens)
+    THREADPOOL_WAITING.set(stats.tasks_waiting)
+
+
+def observe_serialization(encoder: str, seconds: float):
+    """
+    Enregistre la durée d'encodage d'une réponse, rattachée à la route en cours.
+    Étape distincte de http_request_duration_seconds, qui l'inclut.
+    """
+    scope = current_scope.get() or {}
+    RESPONSE_SERIALIZATION.observe(seconds, scope.get("method", ""), _route_template(scope), encoder)
+
+
+class MeasuredQueuePool(QueuePool):
+    """
+    QueuePool qui mesure le temps d'obtention d'une connexion (attente incluse).
+    """
+    def connect(self):
+        start = time.perf_counter()
+        connection = super().connect()
+        DB_POOL_WAIT.observe(time.perf_counter() - start)
+        return connection
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI qui mesure la latence, le code de statut et le nombre
+    de requêtes en cours pour chaque route.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            method = scope.get("method", "")
+            route = _route_template(scope)
+            REQUEST_LATENCY.observe(elapsed, method, route)
+            REQUEST_STATUS.inc(method, route, str(status_code))
+
+
+def _route_template(scope) -> str:
+    # Le modèle de chemin (ex: /chambres/{chambre_id}) évite une série par identifiant
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    return "non_routee"
@@ -0,0 +1,81 @@
+# app/services/notifications.py
+"""
+Notifications des rendez-vous, préparées dans la transaction des endpoints.
+
+Les données utiles aux emails sont lues en une requête (colonnes plates, sans
+parcourir les relations ORM) puis mises en file avec le nom du modèle : le rendu
+est fait par le worker (email_templates.py).
+"""
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+
+from app import models
+from app.services.outbox import enqueue_template
+from app.services.owner_digest import OWNER_DIGEST_WINDOW, record_owner_event
+from app.services.projections import Locataire
+
+Proprietaire = aliased(models.User, name="proprietaire")
+
+# Modèle de l'email au locataire selon le nouveau statut du rendez-vous
+TENANT_TEMPLATES = {
+    "en_attente": "locataire_rdv_en_attente",
+    "confirmé": "locataire_rdv_confirme",
+    "annulé": "locataire_rdv_annule",
+}
+
+
+def rendez_vous_contexts(db: Session, rdv_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Contexte des emails (données simples) de chaque rendez-vous, en une seule requête."""
+    query = (
+        select(
+            models.RendezVous.id, models.RendezVous.date_heure, models.RendezVous.statut,
+            Locataire.prenom, Locataire.nom, Locataire.email, Locataire.telephone,
+            models.Chambre.titre, models.Maison.adresse,
+            Proprietaire.prenom, Proprietaire.nom, Proprietaire.email,
+        )
+        .select_from(models.RendezVous)
+        .outerjoin(Locataire, Locataire.id == models.RendezVous.locataire_id)
+        .outerjoin(models.Chambre, models.Chambre.id == models.RendezVous.chambre_id)
+        .outerjoin(models.Maison, models.Maison.id == models.Chambre.maison_id)
+        .outerjoin(Proprietaire, Proprietaire.id == models.Maison.proprietaire_id)
+        .where(models.RendezVous.id.in_(list(rdv_ids)))
+    )
+    contexts = {}
+    for (rdv_id, date_heure, statut, loc_prenom, loc_nom, loc_email, loc_tel,
+         chambre_titre, adresse, prop_prenom, prop_nom, prop_email) in db.execute(query):
+        contexts[rdv_id] = {
+            "rendez_vous_id": rdv_id,
+            "date_heure": date_heure.isoformat() if date_heure else None,
+            "statut": statut,
+            "locataire_nom": f"{loc_prenom} {loc_nom}" if loc_email else "Cher locataire",
+            "locataire_email": loc_email,
+            "locataire_telephone": loc_tel or "Non renseigné",
+            "chambre_titre": chambre_titre or "une chambre",
+            "adresse": adresse or "non spécifiée",
+            "proprietaire_nom": f"{prop_prenom} {prop_nom}" if prop_email else "Le propriétaire",
+            "proprietaire_email": prop_email,
+        }
+    return contexts
+
+
+def notify_tenant(db: Session, context: Dict[str, Any], statut: str):
+    """Met en file l'email au locataire pour le nouveau statut du rendez-vous."""
+    if not context["locataire_email"]:
+        return
+    template = TENANT_TEMPLATES.get(statut, "locataire_rdv_mise_a_jour")
+    enqueue_template(db, context["locataire_email"], template, {**context, "statut": statut})
+
+
+def notify_owner(db: Session, context: Dict[str, Any], action: str):
+    """
+    Notifie le propriétaire : via son prochain résumé groupé (OWNER_DIGEST_WINDOW > 0),
+    ou par un email immédiat. Dans les deux cas, dans la transaction de l'appelant.
+    """
+    if not context["proprietaire_email"]:
+        return
+    if OWNER_DIGEST_WINDOW > 0:
+        record_owner_event(db, context, action)
+    else:
+        enqueue_template(db, context["proprietaire_email"], f"proprietaire_{action}", context)
@@ -0,0 +1,45 @@
+# app/services/outbox.py
+"""
+File d'envoi persistante (outbox) des notifications.
+
+Les endpoints n'envoient plus d'emails : ils ajoutent une ligne à notifications_outbox
+dans la même transaction que la modification métier (la notification existe si et
+seulement si la modification est validée). Le worker (outbox_worker.py) les envoie.
+"""
+import json
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+def enqueue_email(db: Session, to_email: str, subject: str, body: str, html_body: Optional[str] = None) -> models.NotificationOutbox:
+    """
+    Ajoute un email à la file d'envoi. Ne valide pas la transaction :
+    c'est le commit de l'appelant qui la rend effective.
+    """
+    message = models.NotificationOutbox(
+        destinataire=to_email,
+        sujet=subject,
+        corps_texte=body,
+        corps_html=html_body,
+    )
+    db.add(message)
+    return message
+
+
+def enqueue_template(db: Session, to_email: str, template: str, context: Dict[str, Any]) -> models.NotificationOutbox:
+    """
+    Ajoute un email à rendre par le worker (voir email_templates.py) : seuls le nom
+    du modèle et son contexte, des données simples sérialisables en JSON, sont enregistrés.
+    """
+    message = models.NotificationOutbox(
+        destinataire=to_email,
+        sujet="",
+        corps_texte="",
+        modele=template,
+        contexte=json.dumps(context, ensure_ascii=False),
+    )
+    db.add(message)
+    return message
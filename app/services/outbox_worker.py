@@ -0,0 +1,170 @@
+# app/services/outbox_worker.py
+"""
+Worker d'envoi de la file de notifications (notifications_outbox).
+
+Chaque itération : remet en file les messages d'un worker arrêté en cours d'envoi,
+met en file les résumés propriétaire dont la fenêtre est échue (owner_digest.py), réserve un lot de messages dus, les envoie avec une concurrence bornée, puis
+enregistre le résultat (envoyé, nouvel essai avec backoff exponentiel, ou échec définitif).
+Plusieurs workers peuvent tourner en parallèle : la réservation est un UPDATE conditionnel.
+"""
+import json
+import os
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from app import models
+from app.database import SessionLocal
+from app.services.email_templates import render_email
+from app.services.owner_digest import flush_owner_digests
+from app.services.smtp_pool import build_message, close_smtp_pool, get_smtp_pool
+
+# --- Configuration du worker ---
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "4"))          # envois simultanés
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))    # secondes entre deux relevés à vide
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "30"))     # 30 s, 60 s, 120 s...
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "3600"))
+# Un message "en_cours" depuis plus longtemps appartient à un worker arrêté : il est remis en file
+OUTBOX_LOCK_TIMEOUT = float(os.getenv("OUTBOX_LOCK_TIMEOUT", "300"))
+# Lance le worker dans un thread du processus de l'API (pratique en développement)
+OUTBOX_WORKER_EMBEDDED = os.getenv("OUTBOX_WORKER_EMBEDDED", "false").lower() == "true"
+
+Outbox = models.NotificationOutbox
+
+
+def deliver_email(message: Outbox):
+    """
+    Envoie un message de la file via le pool SMTP ; lève une exception en cas d'échec.
+    Les messages enregistrés avec un modèle sont rendus ici, hors du chemin des requêtes.
+    """
+    if message.modele:
+        subject, body, html_body = render_email(message.modele, json.loads(message.contexte or "{}"))
+    else:
+        subject, body, html_body = message.sujet, message.corps_texte, message.corps_html
+    msg = build_message(message.destinataire, subject, body, html_body)
+    get_smtp_pool().send(msg, message.destinataire)
+
+
+def backoff_delay(attempts: int) -> float:
+    """Délai avant le prochain essai : exponentiel, plafonné, avec gigue de ±20 %."""
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class OutboxWorker:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        deliver: Callable[[Outbox], None] = deliver_email,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        concurrency: int = OUTBOX_CONCURRENCY,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.deliver = deliver
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="outbox")
+
+    def _release_stale(self, db, now: datetime):
+        db.query(Outbox).filter(
+            Outbox.statut == "en_cours",
+            Outbox.verrouille_le < now - timedelta(seconds=OUTBOX_LOCK_TIMEOUT),
+        ).update({"statut": "en_attente", "verrouille_par": None}, synchronize_session=False)
+
+    def _claim(self, db, now: datetime):
+        """Réserve un lot de messages dus ; seul le worker dont le jeton est posé les envoie."""
+        ids = [
+            message_id for (message_id,) in db.query(Outbox.id).filter(
+                Outbox.statut == "en_attente",
+                Outbox.prochaine_tentative_le <= now,
+            ).order_by(Outbox.prochaine_tentative_le, Outbox.id).limit(self.batch_size)
+        ]
+        if not ids:
+            return []
+        token = uuid.uuid4().hex
+        db.query(Outbox).filter(Outbox.id.in_(ids), Outbox.statut == "en_attente").update(
+            {"statut": "en_cours", "verrouille_le": now, "verrouille_par": token}, synchronize_session=False,
+        )
+        db.commit()
+        return db.query(Outbox).filter(Outbox.verrouille_par == token, Outbox.statut == "en_cours").all()
+
+    def _record(self, message: Outbox, error: Optional[BaseException], now: datetime):
+        message.verrouille_par = None
+        if error is None:
+            message.statut = "envoye"
+            message.envoye_le = now
+            message.derniere_erreur = None
+            return
+        message.tentatives += 1
+        message.derniere_erreur = str(error)[:1000]
+        if message.tentatives >= OUTBOX_MAX_ATTEMPTS:
+            message.statut = "echec"
+            print(f"Outbox: abandon du message {message.id} pour {message.destinataire} après {message.tentatives} essais: {error}")
+        else:
+            message.statut = "en_attente"
+            message.prochaine_tentative_le = now + timedelta(seconds=backoff_delay(message.tentatives))
+
+    def run_once(self) -> int:
+        """Traite un lot ; retourne le nombre de messages pris en charge."""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            self._release_stale(db, now)
+            flush_owner_digests(db, now)
+            messages = self._claim(db, now)
+            if not messages:
+                db.commit()
+                return 0
+            # Envoi concurrent (borné par le pool) ; la session n'est utilisée que dans ce thread
+            futures = [(message, self.executor.submit(self.deliver, message)) for message in messages]
+            for message, future in futures:
+                self._record(message, future.exception(), datetime.utcnow())
+            db.commit()
+            return len(messages)
+        finally:
+            db.close()
+
+    def run_forever(self, stop_event: threading.Event):
+        print("Outbox: worker démarré")
+        while not stop_event.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:  # Base indisponible, etc. : on réessaie au prochain tour
+                print(f"Outbox: erreur du worker: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                stop_event.wait(self.poll_interval)
+        self.executor.shutdown(wait=True)
+        close_smtp_pool()
+        print("Outbox: worker arrêté")
+
+
+# --- Worker intégré au processus de l'API (OUTBOX_WORKER_EMBEDDED=true) ---
+_embedded_stop: Optional[threading.Event] = None
+_embedded_thread: Optional[threading.Thread] = None
+
+
+def start_embedded_worker():
+    global _embedded_stop, _embedded_thread
+    if not OUTBOX_WORKER_EMBEDDED or _embedded_thread is not None:
+        return
+    _embedded_stop = threading.Event()
+    _embedded_thread = threading.Thread(
+        target=OutboxWorker().run_forever, args=(_embedded_stop,), name="outbox-worker", daemon=True,
+    )
+    _embedded_thread.start()
+
+
+def stop_embedded_worker():
+    global _embedded_stop, _embedded_thread
+    if _embedded_thread is None:
+        return
+    _embedded_stop.set()
+    _embedded_thread.join(timeout=10)
+    _embedded_stop = _embedded_thread = None
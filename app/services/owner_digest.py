@@ -0,0 +1,118 @@
+# app/services/owner_digest.py
+"""
+Résumés groupés des notifications propriétaire (rendez-vous).
+
+Au lieu d'un email par création, modification ou annulation, chaque événement est
+enregistré dans notifications_proprietaire_evenements. Lorsque le plus ancien
+événement d'un destinataire a OWNER_DIGEST_WINDOW secondes, le worker de l'outbox
+regroupe tous ses événements en un seul email (modèle proprietaire_resume).
+Les événements successifs d'un même rendez-vous sont fusionnés : seul son
+dernier état figure dans le résumé.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.outbox import enqueue_template
+
+# Fenêtre de regroupement en secondes ; 0 : un email par événement (comportement historique)
+OWNER_DIGEST_WINDOW = float(os.getenv("OWNER_DIGEST_WINDOW", "900"))
+
+Event = models.OwnerNotificationEvent
+
+ACTION_LABELS = {
+    "creation": "Nouvelle demande",
+    "modification_date": "Nouvelle date proposée",
+    "annulation_locataire": "Annulé par le locataire",
+    "annulation_proprietaire": "Annulé par vous",
+}
+
+
+def record_owner_event(db: Session, context: Dict[str, Any], action: str) -> Event:
+    """
+    Enregistre un événement pour le prochain résumé du propriétaire, à partir du
+    contexte de notifications.rendez_vous_contexts. Ne valide pas la transaction.
+    """
+    event = Event(
+        destinataire=context["proprietaire_email"],
+        rendez_vous_id=context["rendez_vous_id"],
+        action=action,
+        chambre_titre=context["chambre_titre"],
+        adresse=context["adresse"],
+        locataire_nom=context["locataire_nom"],
+        locataire_telephone=context["locataire_telephone"],
+        date_heure=datetime.fromisoformat(context["date_heure"]) if context["date_heure"] else None,
+    )
+    db.add(event)
+    return event
+
+
+def collapse_events(events: List[Event]) -> List[Tuple[str, Event]]:
+    """
+    Fusionne les événements par rendez-vous (events triés par id) ; retourne (action, dernier état).
+    Une demande créée puis annulée dans la fenêtre disparaît ; une demande créée puis
+    déplacée reste une nouvelle demande, à la dernière date proposée.
+    """
+    by_rdv = {}
+    for event in events:
+        by_rdv.setdefault(event.rendez_vous_id, []).append(event)
+
+    items = []
+    for rdv_events in by_rdv.values():
+        first, last = rdv_events[0].action, rdv_events[-1]
+        if first == "creation" and last.action.startswith("annulation"):
+            continue
+        action = "creation" if first == "creation" else last.action
+        items.append((action, last))
+    items.sort(key=lambda item: (item[1].date_heure or datetime.max, item[1].rendez_vous_id))
+    return items
+
+
+def digest_context(items: List[Tuple[str, Event]]) -> Dict[str, Any]:
+    """Contexte du modèle proprietaire_resume (une ligne par rendez-vous)."""
+    return {
+        "nombre": len(items),
+        "lignes": [
+            {
+                "libelle": ACTION_LABELS.get(action, action),
+                "chambre_titre": event.chambre_titre,
+                "adresse": event.adresse,
+                "date_heure": event.date_heure.isoformat() if event.date_heure else None,
+                "locataire_nom": event.locataire_nom or "Locataire",
+                "locataire_telephone": event.locataire_telephone or "Non renseigné",
+            }
+            for action, event in items
+        ],
+    }
+
+
+def flush_owner_digests(db: Session, now: datetime) -> int:
+    """
+    Met en file un résumé pour chaque destinataire dont la fenêtre est échue.
+    Chaque destinataire est traité dans sa propre transaction ; retourne le nombre de résumés.
+    """
+    cutoff = now - timedelta(seconds=OWNER_DIGEST_WINDOW)
+    due = [
+        destinataire for (destinataire,) in db.query(Event.destinataire)
+        .group_by(Event.destinataire)
+        .having(func.min(Event.cree_le) <= cutoff)
+    ]
+    sent = 0
+    for destinataire in due:
+        events = db.query(Event).filter(Event.destinataire == destinataire).order_by(Event.id).all()
+        ids = [event.id for event in events]
+        items = collapse_events(events)
+        if items:
+            enqueue_template(db, destinataire, "proprietaire_resume", digest_context(items))
+        deleted = db.query(Event).filter(Event.id.in_(ids)).delete(synchronize_session=False)
+        if deleted != len(ids):
+            # Un autre worker a traité ce destinataire en même temps : son résumé fait foi
+            db.rollback()
+            continue
+        db.commit()
+        sent += bool(items)
+    return sent
@@ -0,0 +1,137 @@
+# app/services/pagination.py
+"""
+Pagination par curseur (keyset) et filtres communs des listes.
+
+Les listes métier sont triées par (colonne de date DESC, id DESC) via
+keyset_paginate, les listes CRUD par id croissant via paginate_by_id. Le curseur
+encode la clé de la dernière ligne renvoyée : la page suivante reprend juste
+après elle, via un parcours d'index borné, au lieu d'un OFFSET qui relit les
+lignes sautées.
+"""
+import base64
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import and_, or_
+
+# Taille de page par défaut et maximale
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+
+class PageParams(NamedTuple):
+    limit: int
+    cursor: Optional[list]  # Clé ([valeur de tri,] id) de la dernière ligne de la page précédente
+
+
+class ListFilters(NamedTuple):
+    statut: Optional[str]
+    du: Optional[date]
+    au: Optional[date]
+
+
+def encode_cursor(*key: Any) -> str:
+    """Curseur opaque : clé de tri de la dernière ligne, en JSON encodé base64 (URL-safe)."""
+    values = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in key]
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Curseur de pagination invalide.")
+
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        # La clé se termine toujours par l'id de la ligne
+        if not isinstance(values, list) or not values or not isinstance(values[-1], int):
+            raise ValueError(cursor)
+        return values
+    except ValueError:  # base64, JSON ou forme invalide
+        raise _invalid_cursor()
+
+
+def page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Nombre d'éléments par page"),
+    cursor: Optional[str] = Query(None, description="Curseur `next_cursor` renvoyé par la page précédente"),
+) -> PageParams:
+    """Dépendance : paramètres de pagination (?limit=, ?cursor=)."""
+    return PageParams(limit=limit, cursor=_decode_cursor(cursor) if cursor else None)
+
+
+def list_filters(
+    statut: Optional[str] = Query(None, description="Filtrer par statut"),
+    du: Optional[date] = Query(None, description="Date minimale (incluse)"),
+    au: Optional[date] = Query(None, description="Date maximale (incluse)"),
+) -> ListFilters:
+    """Dépendance : filtres communs (?statut=, ?du=, ?au=), appliqués en SQL par apply_filters."""
+    if du and au and du > au:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'du' doit précéder 'au'.")
+    return ListFilters(statut=statut, du=du, au=au)
+
+
+def apply_filters(stmt, filters: ListFilters, date_column, statut_column):
+    """Ajoute les filtres de statut et de plage de dates à une requête (select ou Query)."""
+    if filters.statut is not None:
+        stmt = stmt.where(statut_column == filters.statut)
+    if filters.du is not None:
+        stmt = stmt.where(date_column >= filters.du)
+    if filters.au is not None:
+        stmt = stmt.where(date_column <= filters.au)
+    return stmt
+
+
+def _cursor_value(column, value):
+    # Le curseur transporte les dates en ISO 8601 : on les reconvertit selon le type de la colonne
+    try:
+        python_type = column.type.python_type
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise _invalid_cursor()
+    return value
+
+
+def keyset_paginate(stmt, page: PageParams, sort_column, id_column):
+    """
+    Trie par (sort_column DESC, id DESC), reprend après le curseur et lit
+    une ligne de plus que la page pour savoir s'il existe une page suivante.
+    """
+    if page.cursor is not None:
+        if len(page.cursor) != 2:
+            raise _invalid_cursor()
+        sort_value, last_id = _cursor_value(sort_column, page.cursor[0]), page.cursor[1]
+        stmt = stmt.where(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < last_id),
+        ))
+    return stmt.order_by(sort_column.desc(), id_column.desc()).limit(page.limit + 1)
+
+
+def split_page(rows: Sequence, page: PageParams, key: Callable[[Any], Tuple]) -> Tuple[List, Optional[str]]:
+    """Retourne (lignes de la page, next_cursor) ; key(ligne) donne la clé ([valeur de tri,] id)."""
+    if len(rows) <= page.limit:
+        return list(rows), None
+    rows = list(rows[:page.limit])
+    return rows, encode_cursor(*key(rows[-1]))
+
+
+def paginate_by_id(query, page: PageParams, id_column) -> Tuple[List, Optional[str]]:
+    """
+    Pagination des listes CRUD : ORDER BY id (clé primaire indexée), reprise après
+    le dernier id vu. Une page profonde coûte autant que la première.
+    Retourne (éléments de la page, next_cursor).
+    """
+    if page.cursor is not None:
+        if len(page.cursor) != 1:
+            raise _invalid_cursor()
+        query = query.where(id_column > page.cursor[0])
+    rows = query.order_by(id_column).limit(page.limit + 1).all()
+    return split_page(rows, page, lambda row: (getattr(row, id_column.key),))
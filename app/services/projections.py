@@ -0,0 +1,232 @@
+# app/services/projections.py
+"""
+Chemin de sérialisation rapide pour les listes volumineuses.
+
+Les requêtes sélectionnent uniquement les colonnes utiles (tuples SQL, sans
+hydratation d'objets ORM) et les réponses sont construites avec model_construct :
+les données viennent de la base, elles n'ont pas besoin d'être revalidées.
+Le JSON est produit par des TypeAdapter précompilés (sérialiseur pydantic-core).
+"""
+import time
+from typing import List, Optional, Sequence, get_args
+
+from fastapi import Query, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app import models, schemas
+from app.services.metrics import observe_serialization
+
+# Le locataire est joint via un alias : la table users peut aussi servir au propriétaire
+Locataire = aliased(models.User, name="locataire")
+
+# --- Colonnes sélectionnées, dans l'ordre attendu par les constructeurs ci-dessous ---
+# Toutes les colonnes lues par les réponses historiques : la projection ne change pas
+# le contenu des réponses, seulement la façon de les construire.
+MAISON_COLUMNS = (
+    models.Maison.id, models.Maison.nom, models.Maison.adresse, models.Maison.ville, models.Maison.superficie,
+    models.Maison.latitude, models.Maison.longitude, models.Maison.description, models.Maison.proprietaire_id,
+    models.Maison.cree_le,
+)
+CHAMBRE_COLUMNS = (
+    models.Chambre.id, models.Chambre.maison_id, models.Chambre.titre, models.Chambre.description,
+    models.Chambre.taille, models.Chambre.type, models.Chambre.meublee, models.Chambre.prix,
+    models.Chambre.capacite, models.Chambre.salle_de_bain, models.Chambre.disponible, models.Chambre.cree_le,
+)
+CONTRAT_COLUMNS = (
+    models.Contrat.id, models.Contrat.locataire_id, models.Contrat.chambre_id, models.Contrat.date_debut,
+    models.Contrat.date_fin, models.Contrat.montant_caution, models.Contrat.mois_caution,
+    models.Contrat.description, models.Contrat.mode_paiement, models.Contrat.periodicite,
+    models.Contrat.statut, models.Contrat.cree_le,
+)
+LOCATAIRE_COLUMNS = (Locataire.id, Locataire.nom, Locataire.prenom, Locataire.email)
+PAIEMENT_COLUMNS = (
+    models.Paiement.id, models.Paiement.contrat_id, models.Paiement.montant, models.Paiement.statut,
+    models.Paiement.date_echeance, models.Paiement.date_paiement, models.Paiement.cree_le,
+)
+RENDEZ_VOUS_COLUMNS = (
+    models.RendezVous.id, models.RendezVous.locataire_id, models.RendezVous.chambre_id,
+    models.RendezVous.date_heure, models.RendezVous.statut, models.RendezVous.cree_le,
+)
+
+def _names(columns) -> tuple:
+    return tuple(column.key for column in columns)
+
+_MAISON_FIELDS = _names(MAISON_COLUMNS)
+_CHAMBRE_FIELDS = _names(CHAMBRE_COLUMNS)
+_CONTRAT_FIELDS = _names(CONTRAT_COLUMNS)
+_LOCATAIRE_FIELDS = _names(LOCATAIRE_COLUMNS)
+_PAIEMENT_FIELDS = _names(PAIEMENT_COLUMNS)
+_RENDEZ_VOUS_FIELDS = _names(RENDEZ_VOUS_COLUMNS)
+
+
+def _nested_model(model_cls, field: str):
+    """Classe du modèle imbriqué déclarée pour `field` (schemas.py redéfinit certains schémas)."""
+    annotation = model_cls.model_fields[field].annotation
+    args = [arg for arg in get_args(annotation) if arg is not type(None)]
+    return args[0] if args else annotation
+
+# Schémas des réponses de liste (inchangés) et de leurs objets imbriqués
+PaiementItem = schemas.PaiementDetailResponse
+PaiementContrat = _nested_model(PaiementItem, "contrat")
+PaiementChambre = _nested_model(PaiementItem, "chambre")
+PaiementMaison = _nested_model(PaiementChambre, "maison")
+PaiementLocataire = _nested_model(PaiementItem, "locataire")
+RendezVousItem = schemas.RendezVousResponse
+RendezVousChambre = _nested_model(RendezVousItem, "chambre")
+RendezVousMaison = _nested_model(RendezVousChambre, "maison")
+RendezVousLocataire = _nested_model(RendezVousItem, "locataire")
+
+# TypeAdapter précompilés pour les réponses de liste
+PAIEMENT_LIST_ADAPTER = TypeAdapter(List[PaiementItem])
+PAIEMENT_PAGE_ADAPTER = TypeAdapter(schemas.Page[PaiementItem])
+PAIEMENT_NORMALIZED_ADAPTER = TypeAdapter(schemas.PaiementNormalizedResponse)
+RENDEZ_VOUS_LIST_ADAPTER = TypeAdapter(List[RendezVousItem])
+
+
+def _construct(model_cls, field_names: Sequence[str], values: Sequence, **extra):
+    """
+    Construit un modèle sans validation à partir des colonnes qu'il déclare ;
+    None si la ligne jointe est absente (id NULL).
+    """
+    if values[0] is None:
+        return None
+    fields = model_cls.model_fields
+    data = {name: value for name, value in zip(field_names, values) if name in fields}
+    return model_cls.model_construct(**data, **extra)
+
+
+def _build_chambre(chambre_cls, maison_cls, chambre_values, maison_values):
+    return _construct(
+        chambre_cls, _CHAMBRE_FIELDS, chambre_values,
+        maison=_construct(maison_cls, _MAISON_FIELDS, maison_values),
+    )
+
+
+# --- Paiements ---
+
+def paiement_list_select():
+    """
+    SELECT des paiements avec contrat, chambre, maison et locataire, en colonnes plates.
+    Les filtres (propriétaire, locataire, statut...) sont ajoutés par l'appelant.
+    """
+    return (
+        select(*PAIEMENT_COLUMNS, *CONTRAT_COLUMNS, *CHAMBRE_COLUMNS, *MAISON_COLUMNS, *LOCATAIRE_COLUMNS)
+        .select_from(models.Paiement)
+        .outerjoin(models.Contrat, models.Contrat.id == models.Paiement.contrat_id)
+        .outerjoin(models.Chambre, models.Chambre.id == models.Contrat.chambre_id)
+        .outerjoin(models.Maison, models.Maison.id == models.Chambre.maison_id)
+        .outerjoin(Locataire, Locataire.id == models.Contrat.locataire_id)
+    )
+
+_P = len(PAIEMENT_COLUMNS)
+_C = _P + len(CONTRAT_COLUMNS)
+_CH = _C + len(CHAMBRE_COLUMNS)
+_M = _CH + len(MAISON_COLUMNS)
+
+_ECHEANCE = _PAIEMENT_FIELDS.index("date_echeance")
+
+def paiement_row_key(row):
+    """Clé de pagination d'une ligne de paiement_list_select : (date_echeance, id)."""
+    return row[_ECHEANCE], row[0]
+
+def build_paiement_item(row) -> schemas.PaiementDetailResponse:
+    return _construct(
+        PaiementItem, _PAIEMENT_FIELDS, row[:_P],
+        contrat=_construct(PaiementContrat, _CONTRAT_FIELDS, row[_P:_C]),
+        chambre=_build_chambre(PaiementChambre, PaiementMaison, row[_C:_CH], row[_CH:_M]),
+        locataire=_construct(PaiementLocataire, _LOCATAIRE_FIELDS, row[_M:]),
+    )
+
+
+def build_paiements_normalized(rows, next_cursor: Optional[str] = None) -> schemas.PaiementNormalizedResponse:
+    """
+    Format normalisé : les paiements référencent contrat, chambre, maison et locataire
+    par id, chaque entité n'étant construite qu'une fois dans `included`.
+    La taille de la réponse croît avec le nombre d'entités distinctes, pas de paiements.
+    """
+    contrats, chambres, maisons, locataires = {}, {}, {}, {}
+    data = []
+    for row in rows:
+        contrat_id, chambre_id, maison_id, locataire_id = row[_P], row[_C], row[_CH], row[_M]
+        if contrat_id is not None and contrat_id not in contrats:
+            contrats[contrat_id] = _construct(schemas.ContratListItem, _CONTRAT_FIELDS, row[_P:_C])
+        if chambre_id is not None and chambre_id not in chambres:
+            chambres[chambre_id] = _construct(schemas.ChambreListItem, _CHAMBRE_FIELDS, row[_C:_CH])
+        if maison_id is not None and maison_id not in maisons:
+            maisons[maison_id] = _construct(schemas.MaisonListItem, _MAISON_FIELDS, row[_CH:_M])
+        if locataire_id is not None and locataire_id not in locataires:
+            locataires[locataire_id] = _construct(schemas.SimpleUserResponse, _LOCATAIRE_FIELDS, row[_M:])
+        data.append(schemas.PaiementNormalizedItem.model_construct(
+            **dict(zip(_PAIEMENT_FIELDS, row[:_P])),
+            chambre_id=chambre_id,
+            maison_id=maison_id,
+            locataire_id=locataire_id,
+        ))
+    return schemas.PaiementNormalizedResponse.model_construct(
+        data=data,
+        included=schemas.PaiementIncluded.model_construct(
+            contrats=contrats, chambres=chambres, maisons=maisons, locataires=locataires,
+        ),
+        next_cursor=next_cursor,
+    )
+
+
+def paiement_list_format(
+    format: str = Query(
+        "imbrique", pattern="^(imbrique|normalise)$",
+        description="imbrique (défaut) : entités copiées dans chaque paiement ; "
+                    "normalise : références par id et entités dédupliquées dans `included`",
+    ),
+) -> str:
+    """Dépendance : format de réponse demandé pour une liste de paiements."""
+    return format
+
+
+def paiement_list_response(rows, format: str, next_cursor: Optional[str] = None) -> Response:
+    """Page de paiements, imbriquée ({items, next_cursor}) ou normalisée selon `format`."""
+    if format == "normalise":
+        return list_response(PAIEMENT_NORMALIZED_ADAPTER, build_paiements_normalized(rows, next_cursor))
+    page = schemas.Page[PaiementItem].model_construct(
+        items=[build_paiement_item(row) for row in rows], next_cursor=next_cursor,
+    )
+    return list_response(PAIEMENT_PAGE_ADAPTER, page)
+
+
+# --- Rendez-vous ---
+
+def rendez_vous_list_select():
+    """SELECT des rendez-vous avec locataire, chambre et maison, en colonnes plates."""
+    return (
+        select(*RENDEZ_VOUS_COLUMNS, *LOCATAIRE_COLUMNS, *CHAMBRE_COLUMNS, *MAISON_COLUMNS)
+        .select_from(models.RendezVous)
+        .outerjoin(Locataire, Locataire.id == models.RendezVous.locataire_id)
+        .outerjoin(models.Chambre, models.Chambre.id == models.RendezVous.chambre_id)
+        .outerjoin(models.Maison, models.Maison.id == models.Chambre.maison_id)
+    )
+
+_R = len(RENDEZ_VOUS_COLUMNS)
+_RL = _R + len(LOCATAIRE_COLUMNS)
+_RC = _RL + len(CHAMBRE_COLUMNS)
+
+def build_rendez_vous_item(row) -> schemas.RendezVousResponse:
+    locataire_id, nom, prenom, email = row[_R:_RL]
+    return _construct(
+        RendezVousItem, _RENDEZ_VOUS_FIELDS, row[:_R],
+        # Nom complet pour les rendez-vous (comme la réponse construite auparavant)
+        locataire=RendezVousLocataire.model_construct(id=locataire_id, nom=f"{prenom} {nom}", email=email)
+        if locataire_id is not None else None,
+        chambre=_build_chambre(RendezVousChambre, RendezVousMaison, row[_RL:_RC], row[_RC:]),
+    )
+
+
+def list_response(adapter: TypeAdapter, items) -> Response:
+    """
+    Sérialise une liste (ou une enveloppe) déjà construite directement en JSON (pydantic-core),
+    sans repasser par la validation du response_model ni par jsonable_encoder.
+    """
+    start = time.perf_counter()
+    body = adapter.dump_json(items)
+    observe_serialization("pydantic", time.perf_counter() - start)
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,42 @@
+# app/services/request_context.py
+from contextvars import ContextVar
+from typing import Optional
+
+# Scope ASGI de la requête en cours.
+# Le routeur de Starlette complète ce même dictionnaire (clé "route") avant d'appeler
+# l'endpoint : on peut donc retrouver le chemin de la route depuis n'importe quel
+# code exécuté pendant la requête (y compris dans le threadpool, anyio copie le contexte).
+current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+
+
+def current_route_label() -> Optional[str]:
+    """
+    Retourne un libellé stable pour la route en cours, ex: "GET /chambres/{chambre_id}".
+    Utilise le modèle de chemin de la route quand il est connu (faible cardinalité),
+    sinon le chemin brut. Retourne None en dehors d'une requête HTTP.
+    """
+    scope = current_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "")
+    method = scope.get("method")
+    return f"{method} {path}" if method else path
+
+
+class RequestContextMiddleware:
+    """
+    Middleware ASGI minimal qui publie le scope de la requête dans `current_scope`.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
@@ -0,0 +1,125 @@
+# app/services/slow_query_log.py
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services.request_context import current_route_label
+
+# --- Configuration du journal des requêtes lentes ---
+SLOW_QUERY_LOG_ENABLED = os.getenv("SLOW_QUERY_LOG_ENABLED", "1") == "1"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100")) # Seuil au-delà duquel une requête est journalisée
+SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", os.path.join("logs", "slow_queries.log"))
+SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024 # Rotation du fichier à 5 Mo
+SLOW_QUERY_LOG_BACKUPS = 5
+
+logger = logging.getLogger("app.slow_queries")
+
+# Clé utilisée dans conn.info pour empiler les heures de début (requêtes imbriquées possibles)
+_START_KEY = "slow_query_start"
+
+
+def _configure_logger():
+    if logger.handlers:
+        return
+    directory = os.path.dirname(SLOW_QUERY_LOG_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = RotatingFileHandler(
+        SLOW_QUERY_LOG_PATH,
+        maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+        backupCount=SLOW_QUERY_LOG_BACKUPS,
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(message)s")) # Une ligne JSON par requête
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """
+    Décrit la forme des paramètres liés (types uniquement) sans jamais journaliser
+    les valeurs, qui peuvent contenir des données personnelles.
+    """
+    if executemany:
+        rows = list(parameters or [])
+        first = parameter_shape(rows[0]) if rows else None
+        return {"executemany": len(rows), "ligne": first}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__ if parameters is not None else None
+
+
+def _explain_query_plan(cursor, statement: str, parameters):
+    """
+    Exécute EXPLAIN QUERY PLAN (SQLite) sur la même connexion DBAPI.
+    Retourne la liste des lignes du plan, ou None si le plan n'est pas disponible.
+    """
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if keyword not in ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT"):
+        return None
+    try:
+        explain_cursor = cursor.connection.cursor()
+        try:
+            explain_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            return [row[-1] for row in explain_cursor.fetchall()]
+        finally:
+            explain_cursor.close()
+    except Exception as e:
+        return [f"plan indisponible: {e}"]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_START_KEY)
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    if elapsed_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    plan = None
+    if conn.dialect.name == "sqlite" and not executemany:
+        plan = _explain_query_plan(cursor, statement, parameters)
+
+    logger.info(json.dumps({
+        "horodatage": datetime.utcnow().isoformat(),
+        "duree_ms": round(elapsed_ms, 3),
+        "route": current_route_label(),
+        "sql": " ".join(statement.split()),
+        "parametres": parameter_shape(parameters, executemany),
+        "plan": plan,
+    }, ensure_ascii=False))
+
+
+def _handle_error(exception_context):
+    # La requête a échoué : after_cursor_execute ne sera pas appelé, on dépile le début
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_START_KEY):
+        conn.info[_START_KEY].pop()
+
+
+def install_slow_query_log(engine: Engine):
+    """
+    Branche la mesure du temps d'exécution sur toutes les requêtes du moteur.
+    Au-delà de SLOW_QUERY_THRESHOLD_MS, la requête (SQL, forme des paramètres,
+    route appelante et plan d'exécution) est écrite dans un journal rotatif.
+    """
+    if not SLOW_QUERY_LOG_ENABLED:
+        return
+    _configure_logger()
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,218 @@
+# app/services/smtp_pool.py
+"""
+Pool de connexions SMTP authentifiées.
+
+Une connexion (TCP + STARTTLS + LOGIN) est réutilisée pour plusieurs messages
+au lieu d'une poignée de main complète par email. Les connexions inactives trop
+longtemps ou ayant envoyé SMTP_MAX_MESSAGES_PER_CONNECTION messages sont
+renouvelées ; une connexion coupée par le serveur est rouverte et l'envoi
+réessayé une fois.
+
+Vérification (réutilisation, NOOP, reconnexion) contre un serveur aiosmtpd local :
+    python scripts/check_smtp_pool.py
+"""
+import os
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from email.message import Message
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Optional
+
+from app.services.email_service import SMTP_PASSWORD, SMTP_PORT, SMTP_SERVER, SMTP_USERNAME
+
+# --- Configuration du pool ---
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_USE_STARTTLS = os.getenv("SMTP_USE_STARTTLS", "true").lower() == "true"
+SMTP_USE_LOGIN = os.getenv("SMTP_USE_LOGIN", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+# Au-delà, la connexion est fermée et rouverte (limites des serveurs, fuites éventuelles)
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+# Une connexion inactive depuis plus longtemps est vérifiée (NOOP) avant réutilisation
+SMTP_IDLE_CHECK_SECONDS = float(os.getenv("SMTP_IDLE_CHECK_SECONDS", "30"))
+SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USERNAME)
+
+# Refus du message par le serveur (la connexion reste valide) ; à tester avant
+# _CONNECTION_ERRORS, les exceptions smtplib héritant d'OSError
+_REFUSED_ERRORS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+# Erreurs qui indiquent une connexion inutilisable
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, OSError)
+
+
+def build_message(to_email: str, subject: str, body: str, html_body: Optional[str] = None) -> Message:
+    msg = MIMEMultipart("alternative")
+    msg['From'] = SMTP_FROM
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    if html_body:
+        msg.attach(MIMEText(html_body, 'html'))
+    return msg
+
+
+class _PooledConnection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    def __init__(
+        self,
+        host: str = SMTP_SERVER,
+        port: int = SMTP_PORT,
+        username: Optional[str] = SMTP_USERNAME,
+        password: Optional[str] = SMTP_PASSWORD,
+        size: int = SMTP_POOL_SIZE,
+        use_starttls: bool = SMTP_USE_STARTTLS,
+        use_login: bool = SMTP_USE_LOGIN,
+        timeout: float = SMTP_TIMEOUT,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.use_starttls = use_starttls
+        self.use_login = use_login
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)  # connexions ouvertes ou en cours d'utilisation
+        self._closed = False
+
+    # --- Cycle de vie des connexions ---
+
+    def _connect(self) -> _PooledConnection:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.use_starttls:
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+            if self.use_login and self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        return _PooledConnection(smtp)
+
+    def _is_usable(self, conn: _PooledConnection) -> bool:
+        if conn.sent >= SMTP_MAX_MESSAGES_PER_CONNECTION:
+            return False
+        if time.monotonic() - conn.last_used > SMTP_IDLE_CHECK_SECONDS:
+            try:
+                return conn.smtp.noop()[0] == 250
+            except Exception:
+                return False
+        return True
+
+    def _acquire(self) -> _PooledConnection:
+        if self._closed:
+            raise RuntimeError("Pool SMTP fermé")
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._is_usable(conn):
+                    return conn
+                conn.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: Optional[_PooledConnection]):
+        try:
+            if conn is not None:
+                if self._closed:
+                    conn.close()
+                else:
+                    conn.last_used = time.monotonic()
+                    self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    # --- Envoi ---
+
+    def send(self, msg: Message, to_email: Optional[str] = None):
+        """
+        Envoie un message sur une connexion du pool (bloquant).
+        Lève une exception si l'envoi échoue, y compris après une reconnexion.
+        """
+        conn = self._acquire()
+        try:
+            try:
+                conn.smtp.send_message(msg, to_addrs=to_email)
+            except _REFUSED_ERRORS:
+                # Message refusé : la connexion reste utilisable après RSET
+                try:
+                    conn.smtp.rset()
+                except Exception:
+                    conn.close()
+                    conn = None
+                raise
+            except _CONNECTION_ERRORS:
+                # Connexion coupée (timeout serveur, redémarrage...) : une reconnexion, un nouvel essai
+                conn.close()
+                conn = None
+                conn = self._connect()
+                conn.smtp.send_message(msg, to_addrs=to_email)
+            conn.sent += 1
+        except BaseException:
+            if conn is not None and not self._is_healthy(conn):
+                conn.close()
+                conn = None
+            raise
+        finally:
+            self._release(conn)
+
+    def _is_healthy(self, conn: _PooledConnection) -> bool:
+        try:
+            return conn.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def close(self):
+        """Ferme les connexions inactives ; celles en cours d'utilisation sont fermées à leur retour."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pool: Optional[SMTPConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Pool partagé du processus, créé à la première utilisation."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPConnectionPool()
+        return _pool
+
+
+def close_smtp_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,138 @@
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+# Ajouter la racine du projet au PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, joinedload
+
+from app import models, schemas
+from app.database import Base
+from app.services.projections import PAIEMENT_LIST_ADAPTER, build_paiement_item, paiement_list_select
+
+
+def seed(db, nb_paiements: int):
+    """Crée un propriétaire, un locataire et nb_paiements paiements répartis sur 20 contrats."""
+    owner = models.User(nom="Proprio", prenom="P", email="proprio@example.com", role="proprietaire", password="x")
+    tenant = models.User(nom="Locataire", prenom="L", email="locataire@example.com", role="locataire", password="x")
+    maison = models.Maison(nom="Maison", adresse="1 rue", ville="Dakar", superficie=120, proprietaire=owner)
+    chambres = [
+        models.Chambre(maison=maison, titre=f"Chambre {i}", type="simple", prix=50000, capacite=2)
+        for i in range(20)
+    ]
+    contrats = [
+        models.Contrat(
+            locataire=tenant, chambre=chambre, date_debut=date(2020, 1, 1), date_fin=date(2030, 1, 1),
+            montant_caution=100000, mois_caution=2, mode_paiement="cash", periodicite="mensuel", statut="actif",
+        )
+        for chambre in chambres
+    ]
+    db.add_all([owner, tenant, maison, *chambres, *contrats])
+    db.flush()
+    db.add_all([
+        models.Paiement(
+            contrat_id=contrats[i % len(contrats)].id, montant=50000, statut="paye",
+            date_echeance=date(2020, 1, 1) + timedelta(days=30 * (i // len(contrats))),
+            date_paiement=datetime(2020, 1, 2),
+        )
+        for i in range(nb_paiements)
+    ])
+    db.commit()
+    return owner.id
+
+
+def serialize_orm(db, owner_id: int) -> bytes:
+    """Ancien chemin : objets ORM + joinedload, modèles validés champ par champ, jsonable_encoder."""
+    paiements = db.query(models.Paiement).options(
+        joinedload(models.Paiement.contrat).joinedload(models.Contrat.locataire),
+        joinedload(models.Paiement.contrat).joinedload(models.Contrat.chambre).joinedload(models.Chambre.maison),
+    ).join(models.Contrat).join(models.Chambre).join(models.Maison).filter(
+        models.Maison.proprietaire_id == owner_id
+    ).order_by(models.Paiement.id).all()
+    response = [
+        schemas.PaiementDetailResponse(
+            id=p.id,
+            contrat_id=p.contrat_id,
+            montant=p.montant,
+            statut=p.statut,
+            date_echeance=p.date_echeance,
+            date_paiement=p.date_paiement,
+            cree_le=p.cree_le,
+            contrat=schemas.ContratResponse.model_validate(p.contrat),
+            chambre=schemas.ChambreResponse(
+                id=p.contrat.chambre.id,
+                cree_le=p.contrat.chambre.cree_le,
+                maison_id=p.contrat.chambre.maison_id,
+                titre=p.contrat.chambre.titre,
+                description=p.contrat.chambre.description,
+                taille=p.contrat.chambre.taille,
+                type=p.contrat.chambre.type,
+                meublee=p.contrat.chambre.meublee,
+                prix=p.contrat.chambre.prix,
+                capacite=p.contrat.chambre.capacite,
+                salle_de_bain=p.contrat.chambre.salle_de_bain,
+                disponible=p.contrat.chambre.disponible,
+                maison=schemas.MaisonResponse.model_validate(p.contrat.chambre.maison),
+            ),
+            locataire=schemas.SimpleUserResponse.model_validate(p.contrat.locataire),
+        )
+        for p in paiements
+    ]
+    return json.dumps(jsonable_encoder(response), separators=(",", ":")).encode("utf-8")
+
+
+def serialize_projection(db, owner_id: int) -> bytes:
+    """Nouveau chemin, même réponse : tuples SQL, model_construct et TypeAdapter précompilé."""
+    rows = db.execute(
+        paiement_list_select().where(models.Maison.proprietaire_id == owner_id).order_by(models.Paiement.id)
+    ).all()
+    return PAIEMENT_LIST_ADAPTER.dump_json([build_paiement_item(row) for row in rows])
+
+
+def bench(label: str, func, session_factory, owner_id: int, repeat: int, nb_rows: int):
+    timings = []
+    for _ in range(repeat):
+        db = session_factory()  # Session neuve : pas de cache d'identité entre deux mesures
+        start = time.perf_counter()
+        payload = func(db, owner_id)
+        timings.append(time.perf_counter() - start)
+        db.close()
+    best = min(timings)
+    print(f"{label:<12} {best * 1000:8.1f} ms  {nb_rows / best:10.0f} lignes/s  {len(payload):>9} octets")
+    return best
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Mesure du débit de sérialisation des listes de paiements')
+    parser.add_argument('--lignes', type=int, default=200, help='Nombre de paiements à sérialiser')
+    parser.add_argument('--repetitions', type=int, default=20, help='Nombre de mesures (la meilleure est retenue)')
+
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")  # Base en mémoire, indépendante de airbnb.db
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        owner_id = seed(db, args.lignes)
+
+    # Les deux chemins doivent produire exactement la même réponse
+    with session_factory() as db:
+        same = json.loads(serialize_orm(db, owner_id)) == json.loads(serialize_projection(db, owner_id))
+    if not same:
+        print("Les deux chemins ne produisent pas la même réponse : comparaison impossible")
+        sys.exit(1)
+
+    print(f"{args.lignes} paiements, meilleur temps sur {args.repetitions} mesures (réponses identiques)")
+    before = bench("avant (ORM)", serialize_orm, session_factory, owner_id, args.repetitions, args.lignes)
+    after = bench("après", serialize_projection, session_factory, owner_id, args.repetitions, args.lignes)
+    print(f"Gain: x{before / after:.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import os
+import smtplib
+import socket
+import sys
+
+# Ajouter la racine du projet au PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # Serveur de test uniquement, non requis par l'application
+    Controller = None
+
+from app.services import smtp_pool
+from app.services.smtp_pool import SMTPConnectionPool, build_message
+
+
+class RecordingHandler:
+    """Serveur SMTP local : mémorise la connexion (port client) de chaque message et les NOOP reçus."""
+
+    def __init__(self):
+        self.peers = []
+        self.noops = 0
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("refuse"):
+            return "550 Destinataire refusé"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_NOOP(self, server, session, envelope, arg):
+        self.noops += 1
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.peers.append(session.peer)
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def check(label: str, condition: bool, detail: str = "") -> bool:
+    print(f"{'OK   ' if condition else 'ECHEC'} {label}{f' ({detail})' if detail else ''}")
+    return condition
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vérifie le pool SMTP (réutilisation, NOOP, reconnexion) contre un serveur aiosmtpd local")
+    parser.add_argument('--messages', type=int, default=5, help='Nombre de messages envoyés sur la même connexion')
+    args = parser.parse_args()
+
+    if Controller is None:
+        print("aiosmtpd n'est pas installé : pip install aiosmtpd")
+        sys.exit(1)
+
+    handler = RecordingHandler()
+    port = free_port()
+    controller = Controller(handler, hostname="localhost", port=port)
+    controller.start()
+    pool = SMTPConnectionPool(host="localhost", port=port, username=None, password=None,
+                              size=2, use_starttls=False, use_login=False, timeout=5)
+    message = lambda: build_message("locataire@example.com", "Test", "Corps du message")
+    results = []
+    try:
+        # 1. Réutilisation : tous les messages passent par une seule connexion
+        smtp_pool.SMTP_IDLE_CHECK_SECONDS = 3600
+        for _ in range(args.messages):
+            pool.send(message(), "locataire@example.com")
+        results.append(check(
+            "réutilisation de la connexion", len(handler.peers) == args.messages and len(set(handler.peers)) == 1,
+            f"{len(handler.peers)} message(s), {len(set(handler.peers))} connexion(s)",
+        ))
+
+        # 2. Refus d'un destinataire : erreur remontée, connexion conservée
+        try:
+            pool.send(message(), "refuse@example.com")
+            refused = False
+        except smtplib.SMTPRecipientsRefused:
+            refused = True
+        pool.send(message(), "locataire@example.com")
+        results.append(check(
+            "refus sans perte de la connexion", refused and len(set(handler.peers)) == 1,
+        ))
+
+        # 3. Connexion inactive : vérifiée par NOOP avant réutilisation
+        smtp_pool.SMTP_IDLE_CHECK_SECONDS = 0
+        noops = handler.noops
+        pool.send(message(), "locataire@example.com")
+        results.append(check(
+            "NOOP sur connexion inactive", handler.noops > noops and len(set(handler.peers)) == 1,
+            f"{handler.noops - noops} NOOP",
+        ))
+
+        # 4. Serveur redémarré : connexion morte détectée à l'envoi, reconnexion et nouvel essai
+        smtp_pool.SMTP_IDLE_CHECK_SECONDS = 3600
+        controller.stop()
+        controller = Controller(handler, hostname="localhost", port=port)
+        controller.start()
+        sent = len(handler.peers)
+        pool.send(message(), "locataire@example.com")
+        results.append(check(
+            "reconnexion après coupure", len(handler.peers) == sent + 1 and len(set(handler.peers)) == 2,
+            f"{len(set(handler.peers))} connexion(s) au total",
+        ))
+
+        # 5. Connexion morte détectée par le NOOP : remplacée avant l'envoi
+        smtp_pool.SMTP_IDLE_CHECK_SECONDS = 0
+        controller.stop()
+        controller = Controller(handler, hostname="localhost", port=port)
+        controller.start()
+        pool.send(message(), "locataire@example.com")
+        results.append(check(
+            "connexion morte remplacée après NOOP", len(set(handler.peers)) == 3,
+        ))
+    finally:
+        pool.close()
+        controller.stop()
+
+    if not all(results):
+        sys.exit(1)
+    print("Pool SMTP : toutes les vérifications sont passées")
+
+
+if __name__ == '__main__':
+    main()
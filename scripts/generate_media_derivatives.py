@@ -0,0 +1,53 @@
+import os
+import sys
+from concurrent.futures import as_completed
+
+# Ajouter la racine du projet au PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import or_
+
+from app import models
+from app.database import SessionLocal
+from app.services.media_derivatives import (
+    IMAGE_TYPES, Image, generate_derivatives, get_derivative_pool, record_result, shutdown_derivative_pool,
+)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Génère les déclinaisons (vignette, carte, plein) des photos")
+    parser.add_argument('--tous', action='store_true', help='Inclure les photos jamais traitées (uploads antérieurs) et en échec')
+    args = parser.parse_args()
+
+    if Image is None:
+        print("Pillow n'est pas installé : pip install Pillow")
+        sys.exit(1)
+
+    statuts = [models.Media.derives_statut == "en_attente"]
+    if args.tous:
+        statuts += [models.Media.derives_statut.is_(None), models.Media.derives_statut == "echec"]
+
+    db = SessionLocal()
+    try:
+        medias = db.query(models.Media.id, models.Media.url).filter(
+            models.Media.type.in_(IMAGE_TYPES), or_(*statuts)
+        ).all()
+    finally:
+        db.close()
+
+    print(f"{len(medias)} photo(s) à traiter")
+    executor = get_derivative_pool()
+    futures = {executor.submit(generate_derivatives, url): media_id for media_id, url in medias}
+    failures = 0
+    for future in as_completed(futures):
+        error = future.exception()
+        failures += error is not None
+        record_result(futures[future], None if error else future.result(), error)
+    shutdown_derivative_pool()
+    print(f"Terminé : {len(medias) - failures} réussie(s), {failures} échec(s)")
+
+
+if __name__ == '__main__':
+    main()
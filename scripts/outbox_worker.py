@@ -0,0 +1,37 @@
+import os
+import signal
+import sys
+import threading
+
+# Ajouter la racine du projet au PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.outbox_worker import (
+    OUTBOX_BATCH_SIZE, OUTBOX_CONCURRENCY, OUTBOX_POLL_INTERVAL, OutboxWorker,
+)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Worker d'envoi des notifications en file (outbox)")
+    parser.add_argument('--une-fois', action='store_true', help='Traiter un seul lot puis quitter')
+    parser.add_argument('--lot', type=int, default=OUTBOX_BATCH_SIZE, help='Nombre de messages réservés par lot')
+    parser.add_argument('--concurrence', type=int, default=OUTBOX_CONCURRENCY, help='Nombre d\'envois simultanés')
+    parser.add_argument('--intervalle', type=float, default=OUTBOX_POLL_INTERVAL, help='Secondes entre deux relevés quand la file est vide')
+
+    args = parser.parse_args()
+
+    worker = OutboxWorker(batch_size=args.lot, concurrency=args.concurrence, poll_interval=args.intervalle)
+    if args.une_fois:
+        print(f"{worker.run_once()} message(s) traité(s)")
+        return
+
+    stop_event = threading.Event()
+    # Arrêt propre : le lot en cours est terminé et enregistré avant de quitter
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    worker.run_forever(stop_event)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import glob
+import json
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+
+# Ajouter la racine du projet au PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.slow_query_log import SLOW_QUERY_LOG_PATH
+
+
+def normalize_sql(sql: str) -> str:
+    """Regroupe les variantes d'une même requête (listes IN de tailles différentes)."""
+    return re.sub(r"\(\s*\?(\s*,\s*\?)+\s*\)", "(?, ...)", sql)
+
+
+def read_entries(path: str):
+    """Lit le journal courant et ses fichiers de rotation (path, path.1, path.2, ...)."""
+    for file_path in sorted(glob.glob(f"{path}*")):
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(path: str, sort_by: str = "total", top: int = 10, route: str = None):
+    groups = defaultdict(lambda: {"durees": [], "routes": Counter(), "plan": None, "parametres": None})
+    for entry in read_entries(path):
+        if route and entry.get("route") != route:
+            continue
+        group = groups[normalize_sql(entry["sql"])]
+        group["durees"].append(entry["duree_ms"])
+        group["routes"][entry.get("route") or "hors requête"] += 1
+        group["plan"] = entry.get("plan") or group["plan"]
+        group["parametres"] = entry.get("parametres")
+
+    rows = []
+    for sql, group in groups.items():
+        durees = group["durees"]
+        rows.append({
+            "sql": sql,
+            "nombre": len(durees),
+            "total": sum(durees),
+            "max": max(durees),
+            "p95": percentile(durees, 95),
+            "routes": group["routes"].most_common(3),
+            "plan": group["plan"],
+            "parametres": group["parametres"],
+        })
+    rows.sort(key=lambda r: r[sort_by], reverse=True)
+    return rows[:top]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Résumé des requêtes SQL les plus lentes')
+    parser.add_argument('--log', default=SLOW_QUERY_LOG_PATH, help='Chemin du journal des requêtes lentes')
+    parser.add_argument('--tri', choices=['total', 'max', 'p95', 'nombre'], default='total', help='Critère de classement')
+    parser.add_argument('--top', type=int, default=10, help='Nombre de requêtes à afficher')
+    parser.add_argument('--route', help='Limiter à une route, ex: "GET /recherche/chambres/"')
+
+    args = parser.parse_args()
+
+    rows = summarize(args.log, sort_by=args.tri, top=args.top, route=args.route)
+    if not rows:
+        print(f"Aucune requête lente trouvée dans {args.log}")
+        return
+
+    for rank, row in enumerate(rows, start=1):
+        print(f"#{rank} total={row['total']:.1f}ms nombre={row['nombre']} max={row['max']:.1f}ms p95={row['p95']:.1f}ms")
+        print(f"   SQL: {row['sql']}")
+        print(f"   Paramètres: {row['parametres']}")
+        print(f"   Routes: {', '.join(f'{r} ({n})' for r, n in row['routes'])}")
+        for step in row['plan'] or []:
+            print(f"   Plan: {step}")
+        print()
+
+if __name__ == '__main__':
+    main()